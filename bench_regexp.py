@@ -0,0 +1,53 @@
+import os
+import random
+import sqlite3
+import string
+import sys
+import time
+
+from gbd_core.database import Database
+from gbd_core.query import GBDQuery
+
+# Compares the REGEXP operator with the equivalent chain of OR-ed like-constraints
+# on a 1:n feature. Usage: python bench_regexp.py [instances] [prefixes]
+
+DB_NAME = "bench_regexp.db"
+instances = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+prefixes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+repetitions = 5
+
+if os.path.exists(DB_NAME):
+    os.remove(DB_NAME)
+sqlite3.connect(DB_NAME).close()
+
+random.seed(0)
+families = ["".join(random.choices(string.ascii_lowercase, k=6)) for _ in range(200)]
+with Database([DB_NAME]) as db:
+    db.create_feature("filename", None)
+    con = sqlite3.connect(DB_NAME)
+    rows = [(f"{i:032x}", f"{random.choice(families)}-{i}.cnf") for i in range(instances)]
+    con.executemany("INSERT INTO filename (hash, value) VALUES (?, ?)", rows)
+    con.execute("UPDATE features SET filename = hash")
+    con.commit()
+    con.close()
+
+    selected = families[:prefixes]
+    queries = {
+        "like-chain": " or ".join(f"filename like {f}-%" for f in selected),
+        "regexp": "filename regexp '^(" + "|".join(selected) + ")-'",
+    }
+    results = {}
+    for name, gbd_query in queries.items():
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            sql = GBDQuery(db, gbd_query).build_query()
+            results[name] = db.query(sql)
+        elapsed = (time.perf_counter() - start) / repetitions
+        print(f"{name:>10}: {elapsed * 1000:8.1f} ms per query (parse + execute), {len(results[name])} hashes")
+
+if os.path.exists(DB_NAME):
+    os.remove(DB_NAME)
+
+if results["like-chain"] != results["regexp"]:
+    print("Result mismatch between like-chain and regexp")
+    sys.exit(1)
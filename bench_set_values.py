@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import sys
+import time
+
+from gbd_core.api import GBD
+
+# Compares per-call GBD.set_values (with and without GBD.batch) with the
+# executemany-based GBD.set_values_bulk on a 1:n and a 1:1 feature. Usage: python bench_set_values.py [rows] [calls]
+
+DB_NAME = "bench_set_values.db"
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+if os.path.exists(DB_NAME):
+    os.remove(DB_NAME)
+sqlite3.connect(DB_NAME).close()
+
+with GBD([DB_NAME]) as api:
+    api.create_feature("local", None)
+    api.create_feature("runtime", "empty")
+    for feature in ["local", "runtime"]:
+        start = time.perf_counter()
+        for i in range(calls):
+            api.set_values(feature, f"call-{i}", [f"{i:032x}"])
+        elapsed = time.perf_counter() - start
+        print(f"{feature:>8} set_values:      {calls / elapsed:10.0f} rows/s ({calls} calls)")
+
+        start = time.perf_counter()
+        with api.batch():
+            for i in range(calls):
+                api.set_values(feature, f"batch-{i}", [f"{i:032x}"])
+        elapsed = time.perf_counter() - start
+        print(f"{feature:>8} batch():         {calls / elapsed:10.0f} rows/s ({calls} calls)")
+
+        start = time.perf_counter()
+        api.set_values_bulk((f"{i:032x}", feature, f"bulk-{i}") for i in range(rows))
+        elapsed = time.perf_counter() - start
+        print(f"{feature:>8} set_values_bulk: {rows / elapsed:10.0f} rows/s ({rows} rows)")
+
+    count = len(api.query("local like bulk-%"))
+
+if os.path.exists(DB_NAME):
+    os.remove(DB_NAME)
+
+if count != rows:
+    print(f"Expected {rows} hashes, found {count}")
+    sys.exit(1)
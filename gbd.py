@@ -75,8 +75,11 @@ def cli_delete(api: GBD, args):
 
 
 def cli_cleanup(api: GBD, args):
-    if args.hashes and len(args.hashes) and (args.force or util.confirm("Delete attributes of given hashes from all features?")):
-        api.delete_hashes(args.hashes, args.target)
+    scope = "all databases" if args.all else f"database '{args.target}'"
+    if args.hashes and len(args.hashes) and (args.force or util.confirm(f"Delete attributes of given hashes from all features of {scope}?")):
+        counts = api.delete_hashes(args.hashes, args.target, args.all)
+        for table, count in counts.items():
+            util.eprint(f"{table}: {count} rows deleted")
 
 
 def cli_rename(api: GBD, args):
@@ -88,11 +91,13 @@ def cli_copy(api: GBD, args):
 
 
 def cli_get(api: GBD, args):
-    df: pl.DataFrame = api.query(args.query, args.hashes, args.resolve, args.collapse, args.group_by, args.join_type)
+    df: pl.DataFrame = api.query(
+        args.query, args.hashes, args.resolve, args.collapse, args.group_by, args.join_type, sort_by=args.sort, limit=args.limit, offset=args.offset
+    )
     if args.header:
         print(args.delimiter.join(df.columns))
     for row in df.iter_rows(named=True):
-        print(args.delimiter.join([str(row[col]) if row[col] is not None else "[None]" for col in df.columns]))
+        print(args.delimiter.join([util.render_value(row[col]) for col in df.columns]))
 
 
 # The `interactive` command was contributed by Christoph Jabs (chrjabs, PR #32).
@@ -112,11 +117,52 @@ def cli_interactive(api: GBD, args):
 
 
 def cli_set(api: GBD, args):
-    hashes = api.query(args.query, args.hashes)["hash"].to_list()
-    if args.create:
-        hashes = list(set(hashes + args.hashes))
-    if len(hashes) > 0:
-        api.set_values(args.assign[0], args.assign[1], hashes)
+    name, value = args.assign
+    if args.create and len(args.hashes):
+        # the query is restricted to the given hashes, all of which are created
+        hashes = list(dict.fromkeys(args.hashes))
+        api.set_values(name, value, hashes)
+        util.eprint(f"Set {name}={value}: {len(hashes)} hashes")
+        return
+    count = api.set_values_by_query(name, value, args.query, args.hashes)
+    util.eprint(f"Set {name}={value}: {count} rows affected")
+
+
+def cli_export(api: GBD, args):
+    format = args.format
+    if format is None:
+        extension = os.path.splitext(args.output)[1].lower()
+        formats = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".arrow": "ipc", ".ipc": "ipc", ".feather": "ipc"}
+        format = formats.get(extension, "parquet")
+    count = api.export(
+        args.output,
+        format,
+        args.query,
+        args.hashes,
+        args.resolve,
+        args.collapse,
+        args.group_by,
+        args.join_type,
+        args.batch_size,
+        args.compression,
+        sort_by=args.sort,
+        limit=args.limit,
+        offset=args.offset,
+    )
+    util.eprint(f"Exported {count} rows to {args.output}")
+
+
+def cli_import(api: GBD, args):
+    extension = os.path.splitext(args.file)[1].lower()
+    if extension == ".parquet":
+        lf = pl.scan_parquet(args.file)
+    elif extension in [".arrow", ".ipc", ".feather"]:
+        lf = pl.scan_ipc(args.file)
+    else:
+        lf = pl.scan_csv(args.file, separator=args.delimiter, infer_schema=False)
+    feature_map = dict(args.feature_map) if args.feature_map else None
+    count = api.import_frame(lf, feature_map, args.hash_column, args.target, args.batch_size)
+    util.eprint(f"Imported {count} values from {args.file}")
 
 
 def cli_info(api: GBD, args):
@@ -204,13 +250,13 @@ def main():
     # init local paths:
     parser_init_local = parser_init_subparsers.add_parser("local", help="Initialize Local Hash/Path Entries")
     parser_init_local.add_argument("path", type=directory_type, help="Path to benchmarks")
-    parser_init_local.set_defaults(func=cli_init_local)
+    parser_init_local.set_defaults(func=cli_init_local, writes=True)
 
     # hooks for configured feature extractors:
     for key, gex in extractors.items():
         parser_init_generic = parser_init_subparsers.add_parser(key, help=gex["description"])
         add_query_and_hashes_arguments(parser_init_generic)
-        parser_init_generic.set_defaults(func=cli_init_generic, initfuncname=key)
+        parser_init_generic.set_defaults(func=cli_init_generic, initfuncname=key, writes=True)
 
     # TRANSFORMATION
     parser_trans = subparsers.add_parser("transform", help="Transform benchmark instances (requires external tools)")
@@ -224,7 +270,7 @@ def main():
     for key, gex in transformers.items():
         parser_trans_generic = parser_trans_subparsers.add_parser(key, help=gex["description"])
         add_query_and_hashes_arguments(parser_trans_generic)
-        parser_trans_generic.set_defaults(func=cli_trans_generic, transfuncname=key)
+        parser_trans_generic.set_defaults(func=cli_trans_generic, transfuncname=key, writes=True)
         parser_trans_generic.add_argument(
             "-c", "--collapse", default="none", choices=["min", "max", "none"], help="Handling multiple values",
         )
@@ -242,15 +288,48 @@ def main():
         "-c",
         "--collapse",
         default="group_concat",
-        choices=["group_concat", "min", "max", "avg", "count", "sum", "none"],
-        help="Specify a function for the handling of multiple feature values",
+        type=collapse_type,
+        help="Specify a function for the handling of multiple feature values: "
+        "group_concat, min, max, avg, count, sum, list, median, mode, stddev, quantile(p), pNN (e.g. p90), or none",
     )
     parser_get.add_argument("-g", "--group_by", default=None, help="Group by the specified feature as the key, rather than by the primary key")
     parser_get.add_argument("--join-type", help="Join Type: treatment of missing values", choices=["INNER", "OUTER", "LEFT"], default="LEFT")
+    parser_get.add_argument(
+        "-s", "--sort", type=sort_type, action="append", default=[], help="Sort by feature[:asc|desc] before the group-by key (repeatable)"
+    )
+    parser_get.add_argument("-l", "--limit", type=int, default=None, help="Print at most that many results")
+    parser_get.add_argument("--offset", type=int, default=None, help="Skip that many results")
     parser_get.add_argument("-d", "--delimiter", default=" ", help="CSV delimiter to use in output")
     parser_get.add_argument("-H", "--header", action="store_true", help="Include header information in output")
     parser_get.set_defaults(func=cli_get)
 
+    # GBD EXPORT $QUERY
+    parser_export = subparsers.add_parser("export", help="Export query result to a Parquet, Arrow IPC, CSV or JSONL file")
+    add_query_and_hashes_arguments(parser_export)
+    parser_export.add_argument("-o", "--output", required=True, help="Output file")
+    parser_export.add_argument(
+        "-f", "--format", choices=GBD.EXPORT_FORMATS, default=None, help="Output format (default: by file extension, else parquet)"
+    )
+    parser_export.add_argument("-r", "--resolve", help="List of feature names to resolve against", nargs="+", default=[])
+    parser_export.add_argument(
+        "-c",
+        "--collapse",
+        default="group_concat",
+        type=collapse_type,
+        help="Specify a function for the handling of multiple feature values: "
+        "group_concat, min, max, avg, count, sum, list, median, mode, stddev, quantile(p), pNN (e.g. p90), or none",
+    )
+    parser_export.add_argument("-g", "--group_by", default=None, help="Group by the specified feature as the key, rather than by the primary key")
+    parser_export.add_argument("--join-type", help="Join Type: treatment of missing values", choices=["INNER", "OUTER", "LEFT"], default="LEFT")
+    parser_export.add_argument(
+        "-s", "--sort", type=sort_type, action="append", default=[], help="Sort by feature[:asc|desc] before the group-by key (repeatable)"
+    )
+    parser_export.add_argument("-l", "--limit", type=int, default=None, help="Export at most that many results")
+    parser_export.add_argument("--offset", type=int, default=None, help="Skip that many results")
+    parser_export.add_argument("--batch-size", type=int, default=10000, help="Rows per streamed batch")
+    parser_export.add_argument("--compression", default="zstd", help="Compression for parquet and ipc, e.g. zstd, lz4, uncompressed")
+    parser_export.set_defaults(func=cli_export)
+
     # GBD INTERACTIVE $QUERY (contributed by chrjabs, PR #32; requires the optional 'interactive' extra)
     parser_interactive = subparsers.add_parser("interactive", help="Query data and open an interactive Python prompt (requires IPython)")
     add_query_and_hashes_arguments(parser_interactive)
@@ -259,8 +338,9 @@ def main():
         "-c",
         "--collapse",
         default="group_concat",
-        choices=["group_concat", "min", "max", "avg", "count", "sum", "none"],
-        help="Specify a function for the handling of multiple feature values",
+        type=collapse_type,
+        help="Specify a function for the handling of multiple feature values: "
+        "group_concat, min, max, avg, count, sum, list, median, mode, stddev, quantile(p), pNN (e.g. p90), or none",
     )
     parser_interactive.add_argument("-g", "--group_by", default=None, help="Group by the specified feature as the key, rather than by the primary key")
     parser_interactive.add_argument("--join-type", help="Join Type: treatment of missing values", choices=["INNER", "OUTER", "LEFT"], default="LEFT")
@@ -273,14 +353,26 @@ def main():
         "-c", "--create", help="Create given hashes if they do not exist yet (otherwise intersect with existing hashes)", action="store_true"
     )
     add_query_and_hashes_arguments(parser_set)
-    parser_set.set_defaults(func=cli_set)
+    parser_set.set_defaults(func=cli_set, writes=True)
+
+    # GBD IMPORT
+    parser_import = subparsers.add_parser("import", help="Import feature values from a hash-keyed CSV, Parquet or Arrow IPC file")
+    parser_import.add_argument("file", type=file_type, help="Path to .csv, .parquet or .arrow/.ipc/.feather file")
+    parser_import.add_argument(
+        "-m", "--feature-map", type=feature_map_type, nargs="+", default=[], help="column=feature pairs to import (default: all columns by name)"
+    )
+    parser_import.add_argument("--hash-column", default="hash", help="Name of the hash column")
+    parser_import.add_argument("-d", "--delimiter", default=",", help="CSV delimiter")
+    parser_import.add_argument("--batch-size", type=int, default=100000, help="Rows per transaction")
+    parser_import.add_argument("--target", help="Target database (default: first in list)", default=None)
+    parser_import.set_defaults(func=cli_import, writes=True)
 
     # CREATE/DELETE/MODIFY FEATURES
     parser_create = subparsers.add_parser("create", help="Create a new feature")
     parser_create.add_argument("name", type=column_type, help="Name of feature")
     parser_create.add_argument("-u", "--unique", help="Unique constraint: specify default-value of feature")
     parser_create.add_argument("--target", help="Target database (default: first in list)", default=None)
-    parser_create.set_defaults(func=cli_create)
+    parser_create.set_defaults(func=cli_create, writes=True)
 
     parser_delete = subparsers.add_parser(
         "delete", help="Delete all values assiociated with given hashes (via argument or stdin) or remove feature if no hashes are given"
@@ -289,25 +381,26 @@ def main():
     parser_delete.add_argument("--values", help="Values to delete", nargs="*", default=[])
     parser_delete.add_argument("name", type=column_type, help="Name of feature (default: all)", nargs="?")
     parser_delete.add_argument("-f", "--force", action="store_true", help="Do not ask for confirmation")
-    parser_delete.set_defaults(func=cli_delete)
+    parser_delete.set_defaults(func=cli_delete, writes=True)
 
     parser_cleanup = subparsers.add_parser("cleanup", help="Delete given hashes from all features")
     parser_cleanup.add_argument("--hashes", help="Hashes for which to delete values", nargs="*", default=[])
     parser_cleanup.add_argument("-f", "--force", action="store_true", help="Do not ask for confirmation")
     parser_cleanup.add_argument("--target", help="Target database (default: first in list)", default=None)
-    parser_cleanup.set_defaults(func=cli_cleanup)
+    parser_cleanup.add_argument("-a", "--all", action="store_true", help="Delete from all writable databases (ignores --target)")
+    parser_cleanup.set_defaults(func=cli_cleanup, writes=True)
 
     parser_rename = subparsers.add_parser("rename", help="Rename feature")
     parser_rename.add_argument("old_name", type=column_type, help="Old name of feature")
     parser_rename.add_argument("new_name", type=column_type, help="New name of feature")
-    parser_rename.set_defaults(func=cli_rename)
+    parser_rename.set_defaults(func=cli_rename, writes=True)
 
-    parser_copy = subparsers.add_parser("copy", help="Copy feature")
+    parser_copy = subparsers.add_parser("copy", help="Copy feature (into an existing 1:1 feature, 1:n features contribute their smallest value)")
     add_query_and_hashes_arguments(parser_copy)
     parser_copy.add_argument("--target", help="Target database (default: first in list)", default=None)
     parser_copy.add_argument("old_name", type=column_type, help="Old name of feature")
     parser_copy.add_argument("new_name", type=column_type, help="New name of feature")
-    parser_copy.set_defaults(func=cli_copy)
+    parser_copy.set_defaults(func=cli_copy, writes=True)
 
     # GET META INFO
     parser_info = subparsers.add_parser("info", help="Print info about available features")
@@ -336,7 +429,10 @@ def main():
         if hasattr(args, "target") and args.target is None:
             args.target = schema.Schema.dbname_from_path(databases[0])
 
-        with GBD(databases, args.verbose) as api:
+        sqlite = gbdconfig.sqlite
+        # the journal mode is stored in the database file, so read-only commands leave it alone
+        journal_mode = sqlite.get("journal_mode") or None if getattr(args, "writes", False) else None
+        with GBD(databases, args.verbose, journal_mode=journal_mode, busy_timeout=sqlite.get("busy_timeout", 10.0), retries=sqlite.get("retries", 8)) as api:
             args.gbdconfig = gbdconfig
             args.extractors = extractors
             args.transformers = transformers
@@ -13,28 +13,79 @@
 # copies or substantial portions of the Software.
 
 
+import itertools
 import sqlite3
 import traceback
-from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 
 import polars as pl
 import tatsu
+from polars.io.plugins import register_io_source
 
 from gbd_core import util
-from gbd_core.database import Database
+from gbd_core.database import Database, DatabaseException
 from gbd_core.database import Schema
 from gbd_core.query import GBDQuery
+from gbd_core.schema import SchemaException
 
 
 class GBDException(Exception):
     pass
 
 
+class PreparedQuery:
+    """Reusable GBD query with parameters, created by :py:meth:`GBD.prepare`
+
+    The query is parsed and compiled to SQL once; each execution binds the given
+    values to the SQL parameters, so SQLite reuses its cached statement.
+    """
+
+    def __init__(self, gbd, sql, cols, collapse, params):
+        self.gbd = gbd
+        self.sql = sql
+        self.cols = cols
+        self.collapse = collapse
+        self.params = params
+
+    def bind(self, values):
+        """Convert the given parameter values for binding
+
+        Raises:
+        GBDException, if a parameter is missing or unknown, or if a number is expected but not given
+        """
+        if set(values) != set(self.params):
+            raise GBDException(f"Expected query parameters {sorted(self.params)}, got {sorted(values)}")
+        bound = dict()
+        for name, value in values.items():
+            if not self.params[name]:
+                bound[name] = str(value)
+            elif util.is_number(value):
+                bound[name] = float(value)
+            else:
+                raise GBDException(f"Query parameter '{name}' must be a number, got '{value}'")
+        return bound
+
+    def query(self, **params) -> pl.DataFrame:
+        """Execute the query with the given parameter values
+
+        Returns:
+        polars.DataFrame: query result
+        """
+        try:
+            rows = self.gbd.database.query(self.sql, params=self.bind(params))
+        except sqlite3.OperationalError as err:
+            raise GBDException(f"Database Operational Error: {err}")
+        return self.gbd.to_frame(rows, self.cols, self.collapse)
+
+
 class GBD:
     # Create a new GBD object which operates on the given databases
-    def __init__(self, dbs: list, verbose: bool = False):
+    # With pool_size > 1, queries can be run concurrently from several threads
+    # journal_mode (e.g. "wal"), busy_timeout and retries configure concurrent writers (see Database)
+    def __init__(self, dbs: list, verbose: bool = False, pool_size: int = 1, journal_mode=None, busy_timeout: float = 10.0, retries: int = 8):
         assert isinstance(dbs, list)
-        self.database = Database(dbs, verbose)
+        self.database = Database(dbs, verbose, pool_size=pool_size, journal_mode=journal_mode, busy_timeout=busy_timeout, retries=retries)
         self.verbose = verbose
 
     def __enter__(self):
@@ -60,39 +111,333 @@ class GBD:
 
         return identify(path)
 
-    def query(self, gbd_query=None, hashes=[], resolve=[], collapse="group_concat", group_by=None, join_type="LEFT") -> pl.DataFrame:
+    def _compile(self, gbd_query, hashes, resolve, collapse, group_by, join_type, sort_by, limit, offset, parallel=1, prepared=False):
+        """Compile a GBD query to SQL for query(), prepare() and query_batches()
+
+        Args:
+        arguments as for query()
+        prepared (bool): allow query parameters (for prepare())
+
+        Returns:
+        tuple: SQL queries (one per group-by range if run in parallel), result column names,
+        normalized collapse function and query parameters
+
+        Raises:
+        GBDException, if the query cannot be compiled, or has parameters but is not prepared
+        """
+        collapse = collapse.lower() if collapse else None
+        if collapse == "none":
+            collapse = None
+        query_builder = GBDQuery(self.database, gbd_query)
+        group = group_by or query_builder.determine_group_by(resolve)
+        try:
+            if parallel > 1 and not sort_by and limit is None and offset is None:
+                ranges = query_builder.partition_bounds(group, parallel)
+                sqls = [query_builder.build_query(hashes, resolve, group_by, join_type, collapse, hash_range) for hash_range in ranges]
+            else:
+                sqls = [query_builder.build_query(hashes, resolve, group_by, join_type, collapse, None, sort_by, limit, offset)]
+        except tatsu.exceptions.FailedParse as err:
+            if self.verbose:
+                util.eprint(traceback.format_exc())
+            raise GBDException(f"Parser Error with Query '{gbd_query}': {err}")
+        except ValueError as err:
+            raise GBDException(f"Invalid collapse function '{collapse}': {err}")
+        params = dict(query_builder.parser.params)
+        if params and not prepared:
+            raise GBDException(f"Query parameters {sorted(params)} require GBD.prepare()")
+        cols = [p.split(":") for p in [group] + resolve]
+        cols = [c[0] if len(c) == 1 else c[1] for c in cols]
+        return sqls, cols, collapse, params
+
+    def query(
+        self,
+        gbd_query=None,
+        hashes=[],
+        resolve=[],
+        collapse="group_concat",
+        group_by=None,
+        join_type="LEFT",
+        timeout=None,
+        cancel=None,
+        parallel=1,
+        sort_by=[],
+        limit=None,
+        offset=None,
+    ) -> pl.DataFrame:
         """Query the database
 
         Args:
         gbd_query (str): GBD query string
         hashes (list): list of hashes (=benchmark ids), the query is restricted to
         resolve (list): list of features to be resolved
-        collapse (str): collapse function: min, max, avg, count, sum, group_concat, or none
+        collapse (str): collapse function: min, max, avg, count, sum, group_concat, list,
+        median, mode, stddev, quantile(p), pNN (e.g. p90), or none
         group_by (str): group results by that feature instead of hash (default)
         join_type (str): join type: left or inner
+        timeout (float, optional): abort the query after that many seconds
+        cancel (CancellationToken, optional): abort the query when the token is cancelled
+        parallel (int, optional): split the group-by value space into that many ranges
+        and query them in parallel threads (use with pool_size >= parallel);
+        ignored if sort_by, limit or offset are given
+        sort_by (list): list of (feature, descending) pairs to sort the result by
+        limit (int, optional): maximum number of result rows
+        offset (int, optional): number of result rows to skip
 
         Returns:
         polars.DataFrame: query result
+
+        Raises:
+        QueryInterruptedException, if the query was aborted by timeout or cancellation
         """
-        if collapse == "none":
-            collapse = None
-        query_builder = GBDQuery(self.database, gbd_query)
+        sqls, cols, collapse, _ = self._compile(gbd_query, hashes, resolve, collapse, group_by, join_type, sort_by, limit, offset, parallel)
+
+        def run(sql):
+            return self.to_frame(self.database.query(sql, timeout, cancel), cols, collapse)
+
         try:
-            sql = query_builder.build_query(hashes, resolve, group_by, join_type, collapse)
-        except tatsu.exceptions.FailedParse as err:
+            if len(sqls) > 1:
+                with ThreadPoolExecutor(max_workers=len(sqls)) as executor:
+                    return pl.concat(list(executor.map(run, sqls)), how="vertical_relaxed")
+            return run(sqls[0])
+        except sqlite3.OperationalError as err:
             if self.verbose:
                 util.eprint(traceback.format_exc())
-            raise GBDException(f"Parser Error with Query '{gbd_query}': {err}")
+            raise GBDException(f"Database Operational Error: {err}")
+
+    @classmethod
+    def to_frame(cls, rows, cols, collapse=None) -> pl.DataFrame:
+        """Create a data frame from query result rows
+
+        Args:
+        rows (list): list of result tuples
+        cols (list): column names
+        collapse (str): collapse function of the query;
+        with collapse=list, the resolved columns become native list columns
+
+        Returns:
+        polars.DataFrame: query result
+        """
+        df = pl.DataFrame(rows, schema=cols, orient="row")
+        if collapse == "list":
+            df = df.with_columns(pl.col(c).cast(pl.Utf8).str.json_decode(pl.List(pl.Utf8)) for c in cols[1:])
+        return df
+
+    def prepare(
+        self, gbd_query, hashes=[], resolve=[], collapse="group_concat", group_by=None, join_type="LEFT", sort_by=[], limit=None, offset=None
+    ) -> PreparedQuery:
+        """Prepare a query with parameters for repeated execution
+
+        Parameters are written as $name on the right-hand side of comparisons, e.g.
+        "family = $f and vars > $v". Numeric comparisons (<, <=, >, >=) take numbers,
+        = and != take strings.
+
+        Args:
+        gbd_query (str): GBD query string with parameters
+        further arguments as for query()
+
+        Returns:
+        PreparedQuery: call its query(**params) method to execute the query, e.g. query(f="x", v=10)
+        """
+        sqls, cols, collapse, params = self._compile(gbd_query, hashes, resolve, collapse, group_by, join_type, sort_by, limit, offset, prepared=True)
+        return PreparedQuery(self, sqls[0], cols, collapse, params)
+
+    def query_batches(
+        self,
+        gbd_query=None,
+        hashes=[],
+        resolve=[],
+        collapse="group_concat",
+        group_by=None,
+        join_type="LEFT",
+        batch_size=1000,
+        cancel=None,
+        sort_by=[],
+        limit=None,
+        offset=None,
+    ):
+        """Query the database and stream the result in batches
+
+        Args:
+        gbd_query (str): GBD query string
+        hashes (list): list of hashes (=benchmark ids), the query is restricted to
+        resolve (list): list of features to be resolved
+        collapse (str): collapse function: min, max, avg, count, sum, group_concat, list,
+        median, mode, stddev, quantile(p), pNN (e.g. p90), or none
+        group_by (str): group results by that feature instead of hash (default)
+        join_type (str): join type: left or inner
+        batch_size (int): maximum number of rows per batch
+        cancel (CancellationToken, optional): abort the query when the token is cancelled
+        sort_by (list): list of (feature, descending) pairs to sort the result by
+        limit (int, optional): maximum number of result rows
+        offset (int, optional): number of result rows to skip
+
+        Yields:
+        polars.DataFrame: consecutive slices of the query result
+
+        Raises:
+        QueryInterruptedException, if the query was aborted by cancellation
+        """
+        sqls, cols, collapse, _ = self._compile(gbd_query, hashes, resolve, collapse, group_by, join_type, sort_by, limit, offset)
         try:
-            result = self.database.query(sql)
+            for batch in self.database.query_batches(sqls[0], batch_size, cancel):
+                yield self.to_frame(batch, cols, collapse)
         except sqlite3.OperationalError as err:
             if self.verbose:
                 util.eprint(traceback.format_exc())
             raise GBDException(f"Database Operational Error: {err}")
-        group = group_by or query_builder.determine_group_by(resolve)
-        cols = [p.split(":") for p in [group] + resolve]
-        cols = [c[0] if len(c) == 1 else c[1] for c in cols]
-        return pl.DataFrame(result, schema=cols, orient="row")
+
+    def count(self, gbd_query=None, hashes=[], timeout=None, cancel=None) -> int:
+        """Count the hashes matching the given query
+
+        Args:
+        gbd_query (str): GBD query string
+        hashes (list): list of hashes (=benchmark ids), the query is restricted to
+        timeout (float, optional): abort the query after that many seconds
+        cancel (CancellationToken, optional): abort the query when the token is cancelled
+
+        Returns:
+        int: number of matching hashes
+        """
+        query_builder = GBDQuery(self.database, gbd_query)
+        try:
+            sql = query_builder.build_query(hashes)
+        except tatsu.exceptions.FailedParse as err:
+            raise GBDException(f"Parser Error with Query '{gbd_query}': {err}")
+        if query_builder.parser.params:
+            raise GBDException(f"Query parameters {sorted(query_builder.parser.params)} require GBD.prepare()")
+        try:
+            [(count,)] = self.database.query(f"SELECT count(*) FROM ({sql})", timeout, cancel)
+        except sqlite3.OperationalError as err:
+            raise GBDException(f"Database Operational Error: {err}")
+        return count
+
+    EXPORT_FORMATS = ["parquet", "ipc", "csv", "jsonl"]
+
+    def export(
+        self,
+        path,
+        format="parquet",
+        gbd_query=None,
+        hashes=[],
+        resolve=[],
+        collapse="group_concat",
+        group_by=None,
+        join_type="LEFT",
+        batch_size=10000,
+        compression="zstd",
+        sort_by=[],
+        limit=None,
+        offset=None,
+    ) -> int:
+        """Stream the result of a query to a file
+
+        Result batches (see query_batches) are fed into a Polars streaming sink,
+        so memory use is bounded by the batch size regardless of the result size.
+        Column types are taken from the first batch (null columns become strings).
+        With format=csv, list columns (collapse=list) are written as JSON arrays.
+
+        Args:
+        path (str): output file
+        format (str): parquet, ipc (Arrow IPC), csv or jsonl
+        compression (str): compression codec for parquet and ipc, e.g. zstd, lz4 or uncompressed
+        further arguments as for query_batches()
+
+        Returns:
+        int: number of exported rows
+
+        Raises:
+        GBDException, if the format is unknown or the query fails
+        """
+        if format not in self.EXPORT_FORMATS:
+            raise GBDException(f"Unknown export format '{format}', use one of {self.EXPORT_FORMATS}")
+        batches = self.query_batches(gbd_query, hashes, resolve, collapse, group_by, join_type, batch_size, None, sort_by, limit, offset)
+        first = next(batches, None)
+        if first is None:
+            first = pl.DataFrame(schema=[c.split(":")[-1] for c in [group_by or GBDQuery(self.database, gbd_query).determine_group_by(resolve)] + resolve])
+        schema = pl.Schema({col: pl.Utf8 if dtype == pl.Null else dtype for col, dtype in first.schema.items()})
+        if format == "csv":
+            schema = pl.Schema({col: pl.Utf8 if isinstance(dtype, pl.List) else dtype for col, dtype in schema.items()})
+        exported = 0
+
+        def source(with_columns, predicate, n_rows, size_hint):
+            nonlocal exported
+            for df in itertools.chain([first], batches):
+                if format == "csv":
+                    df = df.with_columns(
+                        pl.Series(col, [util.render_value(v) for v in df.get_column(col).to_list()], pl.Utf8)
+                        for col, dtype in df.schema.items()
+                        if isinstance(dtype, pl.List)
+                    )
+                df = df.cast(schema)
+                exported += len(df)
+                yield df if with_columns is None else df.select(with_columns)
+
+        lf = register_io_source(source, schema=schema)
+        try:
+            if format == "parquet":
+                lf.sink_parquet(path, compression=compression)
+            elif format == "ipc":
+                lf.sink_ipc(path, compression=None if compression == "uncompressed" else compression)
+            elif format == "csv":
+                lf.sink_csv(path)
+            else:
+                lf.sink_ndjson(path)
+        finally:
+            batches.close()
+        return exported
+
+    def lookup(self, hashes, features, frame=True):
+        """Look up the values of given features for given hashes
+
+        Bypasses query parsing and building: values are read by direct, parameterized
+        point lookups in the feature tables (no context translation).
+
+        Args:
+        hashes (list): list of hashes (=benchmark ids)
+        features (list): list of feature names
+        frame (bool): return a polars.DataFrame if True, else a dict of columns
+
+        Returns:
+        polars.DataFrame or dict: one row per given hash with column 'hash' and a column per feature;
+        values of 1:n features are lists, missing values are None (1:1) or empty lists (1:n)
+
+        Raises:
+        GBDException, if a feature does not exist
+        """
+        try:
+            values = self.database.lookup(hashes, features)
+        except DatabaseException as err:
+            raise GBDException(str(err))
+        columns = {"hash": list(hashes)}
+        schema = {"hash": pl.Utf8}  # value types of 1:1 features are inferred
+        for feature in features:
+            finfo = self.database.find(feature)
+            name = feature.split(":")[-1]
+            is_list = finfo.default is None and finfo.table != "features"
+            columns[name] = [values[feature].get(hash, [] if is_list else None) for hash in hashes]
+            if is_list:
+                schema[name] = pl.List(pl.Utf8)
+        return pl.DataFrame(columns, schema_overrides=schema) if frame else columns
+
+    @contextmanager
+    def batch(self):
+        """Group all writes of the enclosed block into one transaction
+
+        Writes are committed at the end of the outermost block (one sync per database
+        instead of one per call). The commit is atomic per database file; in WAL
+        journal mode, SQLite does not guarantee atomicity across several databases,
+        so a crash during the commit may leave some of them updated and others not.
+        Nested blocks use savepoints:
+        an exception rolls back the innermost block and is re-raised, and an
+        exception that leaves the outermost block rolls back everything.
+
+        Example:
+        with gbd.batch():
+            for hash, value in results.items():
+                gbd.set_values("result", value, [hash])
+        """
+        with self.database.batch():
+            yield self
 
     def set_values(self, name, value, hashes, target_db=None):
         """Set feature value for given hashes
@@ -112,6 +457,122 @@ class GBD:
             raise GBDException("No hashes given")
         self.database.set_values({name: value}, hashes, target_db)
 
+    def set_values_bulk(self, rows, target_db=None):
+        """Set many feature values at once
+
+        Values are bound as parameters and written in chunks with executemany
+        on a persistent connection, within a single transaction per database.
+
+        Args:
+        rows (iterable): (hash, feature, value) triples, e.g. a generator
+        target_db (str, optional): name of target database
+        if None, each feature's database is used
+
+        Raises:
+        GBDException, if a feature does not exist
+        """
+        try:
+            self.database.set_values_bulk(rows, target_db)
+        except DatabaseException as err:
+            raise GBDException(str(err))
+
+    def import_frame(self, df, feature_map=None, hash_column="hash", target_db=None, batch_size=100000):
+        """Import a hash-keyed table of feature values
+
+        The table is written in slices of batch_size rows, each with bulk
+        parameterized inserts in its own transaction (see set_values_bulk).
+        Null cells are skipped. Missing features are created in target_db:
+        as 1:n features if a hash occurs more than once, otherwise as 1:1
+        features with default value "empty".
+
+        Args:
+        df (polars.DataFrame or polars.LazyFrame): table with a hash column, e.g. from pl.scan_parquet()
+        feature_map (dict, optional): maps column names to feature names
+        if None, all columns but the hash column are imported under their own name
+        hash_column (str): name of the hash column
+        target_db (str, optional): name of target database
+        if None, default database (first in list) is used
+        batch_size (int): number of table rows per slice
+
+        Returns:
+        int: number of imported (hash, feature, value) triples
+
+        Raises:
+        GBDException, if a column does not exist or a feature name is invalid
+        """
+        columns = df.collect_schema().names()
+        if feature_map is None:
+            feature_map = {col: col for col in columns if col != hash_column}
+        missing = [col for col in [hash_column] + list(feature_map) if col not in columns]
+        if missing:
+            raise GBDException(f"Columns {missing} not found in {columns}")
+        new_features = [feature for feature in feature_map.values() if not self.feature_exists(feature, target_db)]
+        if new_features:
+            lf = df.lazy().select(pl.col(hash_column).is_duplicated().any())
+            default = None if lf.collect().item() else "empty"
+            for feature in new_features:
+                try:
+                    self.create_feature(feature, default, target_db)
+                except SchemaException as err:
+                    raise GBDException(str(err))
+        selection = [pl.col(hash_column).cast(pl.Utf8)] + [pl.col(col).cast(pl.Utf8) for col in feature_map]
+        if isinstance(df, pl.LazyFrame):
+            lf = df.select(selection)
+            slices = lf.collect_batches(chunk_size=batch_size) if hasattr(lf, "collect_batches") else lf.collect().iter_slices(batch_size)
+        else:
+            slices = df.select(selection).iter_slices(batch_size)
+        count = 0
+        for frame in slices:
+            hashes = frame.get_column(hash_column).to_list()
+            rows = [
+                (hashv, feature, value)
+                for col, feature in feature_map.items()
+                for hashv, value in zip(hashes, frame.get_column(col).to_list())
+                if value is not None and hashv is not None
+            ]
+            self.set_values_bulk(rows, target_db)
+            count += len(rows)
+        return count
+
+    def set_values_by_query(self, name, value, gbd_query=None, hashes=[], target_db=None):
+        """Set feature value for all hashes matching the given query
+
+        The query result is written inside SQLite (INSERT ... SELECT)
+        without fetching the hashes into Python.
+
+        Args:
+        name (str): feature name
+        value (str): value to be set
+        gbd_query (str): GBD query string
+        hashes (list): list of hashes (=benchmark ids), the query is restricted to
+        target_db (str, optional): name of target database
+        if None, default database (first in list) is used
+
+        Returns:
+        int: number of inserted or updated rows
+
+        Raises:
+        GBDException, if feature does not exist, or if the query is invalid or has parameters
+        """
+        if not self.feature_exists(name, target_db):
+            raise GBDException(f"Feature '{name}' does not exist")
+        query_builder = GBDQuery(self.database, gbd_query)
+        try:
+            sql = query_builder.build_query(hashes)
+        except tatsu.exceptions.FailedParse as err:
+            if self.verbose:
+                util.eprint(traceback.format_exc())
+            raise GBDException(f"Parser Error with Query '{gbd_query}': {err}")
+        if query_builder.parser.params:
+            raise GBDException(f"Query parameters {sorted(query_builder.parser.params)} are not supported by set_values_by_query()")
+        try:
+            counts = self.database.set_values_from_query({name: value}, sql, target_db)
+        except sqlite3.OperationalError as err:
+            if self.verbose:
+                util.eprint(traceback.format_exc())
+            raise GBDException(f"Database Operational Error: {err}")
+        return counts[name]
+
     def reset_values(self, feature, values=[], hashes=[], target_db=None):
         """Reset feature value for given hashes
 
@@ -127,34 +588,30 @@ class GBD:
         """
         if not self.feature_exists(feature, target_db):
             raise GBDException(f"Feature '{feature}' does not exist")
-        if len(values) and len(hashes):
-            for values_slice in util.slice_iterator(values, 10):
-                for hashes_slice in util.slice_iterator(hashes, 10):
-                    self.database.delete(feature, values_slice, hashes_slice, target_db)
-                    self.database.commit()
-        elif len(values):
-            for values_slice in util.slice_iterator(values, 10):
-                self.database.delete(feature, values_slice, [], target_db)
-                self.database.commit()
-        elif len(hashes):
-            for hashes_slice in util.slice_iterator(hashes, 10):
-                self.database.delete(feature, [], hashes_slice, target_db)
-                self.database.commit()
-
-    def delete_hashes(self, hashes, target_db=None):
+        if len(values) or len(hashes):
+            self.database.delete(feature, values, hashes, target_db)
+
+    def delete_hashes(self, hashes, target_db=None, all_databases=False):
         """Delete all values for given hashes
 
+        Hashes are loaded once into a temporary table and deleted from all tables
+        in one transaction.
+
         Args:
         hashes (list): list of hashes (=benchmark ids) to be deleted
         target_db (str, optional): name of target database
         if None, default database (first in list) is used
+        all_databases (bool): delete from all writable databases instead of target_db
+
+        Returns:
+        dict: number of deleted rows per table, keyed by "database.table"
 
         Raises:
-        GBDException, if feature does not exist
+        GBDException, if no hashes are given
         """
         if not len(hashes):
             raise GBDException("No hashes given")
-        self.database.delete_hashes_entirely(hashes, target_db)
+        return self.database.delete_hashes_entirely(hashes, target_db, all_databases)
 
     def get_databases(self, context=None):
         """Get list of database names
@@ -303,20 +760,38 @@ class GBD:
     def copy_feature(self, old_name, new_name, target_db=None, gbd_query=None, hashes=[]):
         """Copies feature with given name
 
+        The values are copied inside SQLite (INSERT ... SELECT)
+        without fetching them into Python. A missing new feature is created
+        as 1:n feature. If the new feature exists and is 1:1 but the old one is 1:n,
+        only the smallest value of each hash is copied.
+
         Args:
         old_name (str): old feature name
         new_name (str): new feature name
         target_db (str): name of database to copy feature to
         if None, default database (fist in list) is used
+        gbd_query (str): GBD query string, restricts the copied hashes
+        hashes (list): list of hashes (=benchmark ids), restricts the copied hashes
 
-        Returns: None
+        Returns:
+        int: number of inserted or updated rows
+
+        Raises:
+        GBDException, if old feature does not exist, or if the query is invalid or has parameters
         """
         if not self.feature_exists(old_name):
             raise GBDException(f"Feature '{old_name}' does not exist")
 
+        sql = None
+        if gbd_query or len(hashes):
+            [sql], _, _, _ = self._compile(gbd_query, hashes, [], None, None, "LEFT", [], None, None)
+
         if not self.feature_exists(new_name, target_db):
             self.create_feature(new_name, target_db=target_db)
 
-        hashes = self.query(gbd_query=gbd_query, hashes=hashes)["hash"].to_list()
-
-        self.database.copy_feature(old_name, new_name, target_db, hashes)
+        try:
+            return self.database.copy_feature(old_name, new_name, target_db, sql)
+        except sqlite3.OperationalError as err:
+            if self.verbose:
+                util.eprint(traceback.format_exc())
+            raise GBDException(f"Database Operational Error: {err}")
@@ -0,0 +1,134 @@
+# MIT License
+
+# Copyright (c) 2025 Ashlin Iser, Karlsruhe Institute of Technology (KIT)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+
+from gbd_core.api import GBD
+from gbd_core.database import CancellationToken
+
+
+class AsyncGBD:
+    """asyncio facade of :py:class:`GBD`.
+
+    All calls run in a bounded thread pool on a pooled :py:class:`GBD` instance, so
+    independent queries overlap.  At most *pool_size* reads (queries, counts and open
+    streams) hold a connection at a time; further reads wait without blocking the
+    event loop.  Writes are serialised on the main connection.
+
+    Cancelling a task that awaits a read also aborts the running SQLite statement.
+    Writes are not interruptible: a cancelled write still completes in the background.
+
+    Typical usage::
+
+        async with AsyncGBD(["meta.db"], pool_size=4) as agbd:
+            df = await agbd.query("family = hardware", resolve=["filename"])
+            async for batch in agbd.query_batches(resolve=["local"]):
+                ...
+    """
+
+    def __init__(self, dbs: list, verbose: bool = False, pool_size: int = 4):
+        """
+        Args:
+            dbs (list[str]): Ordered list of database paths (see :py:class:`GBD`).
+            verbose (bool): Print every executed SQL statement to stderr.
+            pool_size (int): Number of pooled read connections and concurrent reads.
+        """
+        self.gbd = GBD(dbs, verbose, pool_size=pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size + 1, thread_name_prefix="gbd")
+        self.slots = asyncio.Semaphore(pool_size)
+
+    async def __aenter__(self):
+        self.gbd.__enter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await asyncio.to_thread(self.executor.shutdown)
+        self.gbd.__exit__(exc_type, exc, traceback)
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` in the internal thread pool."""
+        return await asyncio.wrap_future(self.executor.submit(functools.partial(func, *args, **kwargs)))
+
+    async def read(self, func, *args, **kwargs):
+        """Run the read ``func(*args, **kwargs, cancel=token)`` on a free slot.
+
+        The cancellation token is cancelled if the awaiting task is cancelled.
+        """
+        token = CancellationToken()
+        async with self.slots:
+            try:
+                return await self.run(func, *args, cancel=token, **kwargs)
+            except asyncio.CancelledError:
+                token.cancel()
+                raise
+
+    async def query(
+        self, gbd_query=None, hashes=[], resolve=[], collapse="group_concat", group_by=None, join_type="LEFT", timeout=None, sort_by=[], limit=None, offset=None
+    ) -> pl.DataFrame:
+        """Awaitable :py:meth:`GBD.query`"""
+        return await self.read(
+            self.gbd.query, gbd_query, hashes, resolve, collapse, group_by, join_type, timeout, sort_by=sort_by, limit=limit, offset=offset
+        )
+
+    async def count(self, gbd_query=None, hashes=[], timeout=None) -> int:
+        """Awaitable :py:meth:`GBD.count`"""
+        return await self.read(self.gbd.count, gbd_query, hashes, timeout)
+
+    async def query_batches(
+        self, gbd_query=None, hashes=[], resolve=[], collapse="group_concat", group_by=None, join_type="LEFT", batch_size=1000, sort_by=[], limit=None, offset=None
+    ):
+        """Asynchronously iterate over the result of :py:meth:`GBD.query_batches`
+
+        The stream holds a slot until it is exhausted or closed.
+
+        Yields:
+        polars.DataFrame: consecutive slices of the query result
+        """
+        token = CancellationToken()
+        async with self.slots:
+            batches = self.gbd.query_batches(gbd_query, hashes, resolve, collapse, group_by, join_type, batch_size, token, sort_by, limit, offset)
+            step = None
+            try:
+                while True:
+                    step = self.executor.submit(next, batches, None)
+                    batch = await asyncio.wrap_future(step)
+                    if batch is None:
+                        break
+                    yield batch
+            finally:
+                token.cancel()
+                # the generator must not be closed while a step is still running
+                if step is not None and not step.cancel():
+                    await asyncio.wait([asyncio.wrap_future(step)])
+                await self.run(batches.close)
+
+    async def set_values(self, name, value, hashes, target_db=None):
+        """Awaitable :py:meth:`GBD.set_values`"""
+        return await self.run(self.gbd.set_values, name, value, hashes, target_db)
+
+    async def set_values_by_query(self, name, value, gbd_query=None, hashes=[], target_db=None) -> int:
+        """Awaitable :py:meth:`GBD.set_values_by_query`"""
+        return await self.run(self.gbd.set_values_by_query, name, value, gbd_query, hashes, target_db)
+
+    async def reset_values(self, feature, values=[], hashes=[], target_db=None):
+        """Awaitable :py:meth:`GBD.reset_values`"""
+        return await self.run(self.gbd.reset_values, feature, values, hashes, target_db)
+
+    async def delete_hashes(self, hashes, target_db=None, all_databases=False) -> dict:
+        """Awaitable :py:meth:`GBD.delete_hashes`"""
+        return await self.run(self.gbd.delete_hashes, hashes, target_db, all_databases)
@@ -29,7 +29,7 @@ central config file (see :func:`is_config_file`); a legacy database list (or the
 Configuration file format
 --------------------------
 
-A GBD configuration is a TOML document with up to four top-level tables. A file is
+A GBD configuration is a TOML document with up to five top-level tables. A file is
 recognised as a config (rather than a database list) as soon as it contains at least
 one of them. All tables are optional; anything omitted keeps its bundled default.
 
@@ -73,6 +73,16 @@ one of them. All tables are optional; anything omitted keeps its bundled default
       ``none``, ``xz``, ``gz``, ``bz2``.
     - ``description`` (str): human-readable description.
 
+``[sqlite]``
+    Connection settings for the SQLite database files.
+
+    - ``journal_mode`` (str): journal mode that commands which write set on every
+      writable database file (e.g. ``"wal"``, ``"delete"``); read-only commands and
+      an empty string keep each file's mode.
+    - ``busy_timeout`` (float): seconds a statement waits for a locked database.
+    - ``retries`` (int): how often a write transaction is retried, with exponential
+      backoff, when the database stays locked beyond the busy timeout.
+
 Registry blocks (``[extractors]``, ``[transformers]``) may be defined inline,
 offloaded to a separate file via ``file = "..."``, or both (inline entries win on a
 name clash). When ``file`` is relative, it is resolved against the directory of the
@@ -98,6 +108,10 @@ Example
 
     [transformers]
     sanitise = { tool = "gbdc sanitize", source = ["cnf"], target = ["sancnf"], output_suffix = ".sanitized.cnf", compress = "xz", description = "Sanitise CNF files." }
+
+    [sqlite]
+    journal_mode = "wal"
+    busy_timeout = 30.0
 """
 
 import os
@@ -117,7 +131,7 @@ except ModuleNotFoundError:  # Python < 3.11
 
 
 ### Top-level tables that identify a file as a GBD configuration
-_CONFIG_TABLES = ("databases", "contexts", "extractors", "transformers")
+_CONFIG_TABLES = ("databases", "contexts", "extractors", "transformers", "sqlite")
 _REGISTRY_BLOCKS = ("extractors", "transformers")
 
 
@@ -242,6 +256,11 @@ class GbdConfig:
         """Registered transformers: ``name -> definition`` (file references resolved)."""
         return self._section("transformers")
 
+    @property
+    def sqlite(self) -> dict:
+        """The ``[sqlite]`` table: ``journal_mode``, ``busy_timeout`` and ``retries``."""
+        return self._section("sqlite")
+
 
 def default_config() -> GbdConfig:
     """The configuration from the environment: bundled defaults plus the ``GBD``
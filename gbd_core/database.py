@@ -12,11 +12,20 @@
 # The above copyright notice and this permission notice shall be included in all
 # copies or substantial portions of the Software.
 
+import copy
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
 import typing
 
-from gbd_core.schema import FeatureInfo, Schema
-from gbd_core.util import eprint
+from contextlib import contextmanager
+
+from gbd_core import functions
+from gbd_core.schema import FeatureInfo, Schema, retry_locked
+from gbd_core.util import eprint, slice_iterator
 
 
 class DatabaseException(Exception):
@@ -25,6 +34,29 @@ class DatabaseException(Exception):
     pass
 
 
+class QueryInterruptedException(DatabaseException):
+    """Raised when a query is aborted by its timeout or by a :py:class:`CancellationToken`.
+    The connection remains usable afterwards."""
+    pass
+
+
+class CancellationToken:
+    """Thread-safe flag that aborts the queries it is passed to (see :py:meth:`Database.query`).
+
+    Call :py:meth:`cancel` from any thread; running queries stop at their next progress
+    check, and queries started later are aborted immediately.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+
 class Database:
     """Manages multiple ATTACHed SQLite databases as a single virtual feature namespace.
 
@@ -48,6 +80,13 @@ class Database:
       so the table is reachable via a JOIN.  A sentinel row ``(hash='None', value='None')``
       is inserted at creation time (see ``Issues.md`` #7).
 
+    **Pooled mode**
+
+    With ``pool_size > 1``, read queries are served by a pool of hub connections with
+    identical ATTACH sets, so a single instance (and its schema catalog) can be queried
+    from several threads concurrently.  Writes always go through the main connection
+    and are serialised by a lock.  Pooled readers only see committed data.
+
     **Feature precedence**
 
     When the same feature name exists in multiple databases, the database that appears first
@@ -63,7 +102,9 @@ class Database:
             rows = db.query(sql)
     """
 
-    def __init__(self, path_list: list, verbose=False, autocommit=True):
+    JOURNAL_MODES = ["delete", "truncate", "persist", "memory", "wal", "off"]
+
+    def __init__(self, path_list: list, verbose=False, autocommit=True, pool_size=1, journal_mode=None, busy_timeout=10.0, retries=8):
         """
         Args:
             path_list (list[str]): Ordered list of paths to ``.db`` or CSV files.
@@ -72,26 +113,40 @@ class Database:
             verbose (bool): Print every executed SQL statement to stderr.
             autocommit (bool): Commit after every :py:meth:`execute` call.  Set to
                 ``False`` for batched writes and call :py:meth:`commit` manually.
+            pool_size (int): Number of pooled read connections; ``1`` (default) serves
+                reads from the main connection.
+            journal_mode (str | None): SQLite journal mode set on all writable database
+                files, e.g. ``"wal"`` for concurrent readers and writers; ``None`` keeps
+                the mode of each file.
+            busy_timeout (float): Seconds a statement waits for a lock held by another
+                connection.
+            retries (int): Retries of write transactions that still find the database
+                locked, with exponential backoff (see :py:func:`retry_locked`).
         """
         self.verbose = verbose
+        self.busy_timeout = busy_timeout
+        self.retries = retries
+        self.retry_delay = 0.01
         self.schemas = self.init_schemas(path_list)
         self.features = self.init_features()
-        # Private in-memory hub (no shared cache) so that concurrent Database instances in the same
-        # process do not share state. CSV/in-memory schemas keep their own named shared-cache dbs,
-        # which are attached to this hub below.
-        self.connection = sqlite3.connect("file::memory:", uri=True, timeout=10)
-        self.cursor = self.connection.cursor()
-        self.maindb = None
+        # first database is the default database:
+        self.maindb = next(iter(self.schemas), None)
         self.autocommit = autocommit
-        schema: Schema
+        self.lock = threading.RLock()
+        self.depth = 0  # nesting depth of transaction()
+        self.savepoints = 0  # nesting depth of batch() savepoints
+        self.reserved = set()  # databases write-locked by the current transaction
+        self.connection = self.connect()
+        self.cursor = self.connection.cursor()
         for schema in self.schemas.values():
-            if not schema.is_in_memory():
-                self.execute(f"ATTACH DATABASE '{schema.path}' AS {schema.dbname}")
-            else:
-                self.execute(f"ATTACH DATABASE 'file:{schema.dbname}?mode=memory&cache=shared' AS {schema.dbname}")
-            # first database is the default database:
-            if not self.maindb:
-                self.maindb = schema.dbname
+            schema.bind(self.connection, self.transaction)
+        if journal_mode is not None:
+            self.set_journal_mode(journal_mode)
+        self.pool = None
+        if pool_size > 1:
+            self.pool = queue.Queue()
+            for _ in range(pool_size):
+                self.pool.put(self.connect())
 
     def __enter__(self):
         return self
@@ -99,6 +154,60 @@ class Database:
     def __exit__(self, exception_type, exception_value, traceback):
         self.connection.commit()
         self.connection.close()
+        for schema in self.schemas.values():
+            schema.dbcon.close()
+        while self.pool is not None and not self.pool.empty():
+            self.pool.get().close()
+
+    def connect(self):
+        """Open a hub connection with all schemas attached and GBD's SQL functions registered.
+
+        Returns:
+            sqlite3.Connection: Connection usable from any (one at a time) thread.
+        """
+        # Private in-memory hub (no shared cache) so that concurrent Database instances in the same
+        # process do not share state. CSV/in-memory schemas keep their own named shared-cache dbs,
+        # which are attached to this hub below.
+        con = sqlite3.connect("file::memory:", uri=True, timeout=self.busy_timeout, check_same_thread=False)
+        functions.register_functions(con)
+        schema: Schema
+        for schema in self.schemas.values():
+            self.attach(con, schema)
+        return con
+
+    @retry_locked
+    def attach(self, con, schema):
+        """ATTACH *schema* to the hub connection *con*; retried while its file is locked."""
+        if not schema.is_in_memory():
+            sql = f"ATTACH DATABASE '{schema.path}' AS {schema.dbname}"
+        else:
+            sql = f"ATTACH DATABASE 'file:{schema.dbname}?mode=memory&cache=shared' AS {schema.dbname}"
+        if self.verbose:
+            eprint(sql)
+        con.execute(sql)
+
+    @contextmanager
+    def reader(self, dedicated=False):
+        """Borrow a connection for read-only statements.
+
+        Yields a pooled connection in pooled mode.  Otherwise yields the (locked) main
+        connection, or a fresh connection that is closed afterwards if *dedicated* is set.
+        """
+        if self.pool is not None:
+            con = self.pool.get()
+            try:
+                yield con
+            finally:
+                self.pool.put(con)
+        elif dedicated:
+            con = self.connect()
+            try:
+                yield con
+            finally:
+                con.close()
+        else:
+            with self.lock:
+                yield self.connection
 
     # returns major version of sqlite3 as float
     @classmethod
@@ -160,33 +269,288 @@ class Database:
                     result[feature.name].append(feature)
         return result
 
-    def query(self, q):
+    # number of SQLite virtual machine instructions between two timeout/cancellation checks
+    PROGRESS_STEPS = 1000
+
+    def query(self, q, timeout=None, cancel=None, params=()):
         """Execute a raw SQL SELECT and return all rows.
 
+        With *timeout* or *cancel*, a progress handler is installed on the connection
+        for the duration of the query and aborts it once the deadline has passed or
+        the token is cancelled.
+
         Args:
             q (str): SQL SELECT statement.
+            timeout (float | None): Maximum runtime in seconds.
+            cancel (CancellationToken | None): Token that aborts the query when cancelled.
+            params (tuple | dict): Values bound to the statement's parameters.
 
         Returns:
             list[tuple]: All result rows as tuples.
+
+        Raises:
+            QueryInterruptedException: If the query was aborted.
+        """
+        if self.verbose:
+            eprint(q)
+        with self.reader() as con, self.interruptible(con, timeout, cancel):
+            return con.execute(q, params).fetchall()
+
+    def query_batches(self, q, batch_size=1000, cancel=None, params=()):
+        """Execute a raw SQL SELECT and stream the result in batches of rows.
+
+        The statement stays open on a borrowed connection until the generator is
+        exhausted or closed: a pooled connection in pooled mode, or a dedicated
+        connection otherwise (so that the main connection remains available).
+
+        Args:
+            q (str): SQL SELECT statement.
+            batch_size (int): Maximum number of rows per batch.
+            cancel (CancellationToken | None): Token that aborts the query when cancelled.
+            params (tuple | dict): Values bound to the statement's parameters.
+
+        Yields:
+            list[tuple]: Non-empty batches of result rows.
+
+        Raises:
+            QueryInterruptedException: If the query was aborted.
         """
         if self.verbose:
             eprint(q)
-        return self.cursor.execute(q).fetchall()
+        with self.reader(dedicated=True) as con, self.interruptible(con, None, cancel):
+            cursor = con.execute(q, params)
+            while batch := cursor.fetchmany(batch_size):
+                yield batch
+
+    def lookup(self, hashes, features):
+        """Fetch the values of *features* for the given *hashes* by direct point lookups.
 
-    def execute(self, q):
+        Bypasses the query parser and builder: per feature table, one parameterized
+        statement selects the rows of all hashes (passed as a single JSON array and
+        unpacked by ``json_each``).  The statement text only depends on the features,
+        so repeated lookups hit the connection's prepared statement cache.  Features
+        are looked up by hash in their own database, without context translation.
+
+        Args:
+            hashes (list[str]): Benchmark hashes.
+            features (list[str]): Feature identifiers (bare name, ``db:name`` or ``context:name``).
+
+        Returns:
+            dict[str, dict]: Per feature, a mapping of each found hash to its value
+                (1:1 features) or to the list of its values (1:n features).
+
+        Raises:
+            DatabaseException: If a feature does not exist.
+        """
+        finfos = {feature: self.find(feature) for feature in features}
+        columns = {}  # 1:1 features grouped by database
+        for feature, finfo in finfos.items():
+            if finfo.default is not None or finfo.table == "features":
+                columns.setdefault(finfo.database, []).append(feature)
+        result = {feature: {} for feature in features}
+        param = (json.dumps(list(hashes)),)
+        with self.reader() as con:
+            for database, fnames in columns.items():
+                select = ", ".join(finfos[f].column for f in fnames)
+                sql = f"SELECT hash, {select} FROM {database}.features WHERE hash IN (SELECT value FROM json_each(?))"
+                for row in con.execute(sql, param):
+                    for fname, value in zip(fnames, row[1:]):
+                        result[fname][row[0]] = value
+            for feature, finfo in finfos.items():
+                if finfo.default is None and finfo.table != "features":
+                    sql = f"SELECT hash, value FROM {finfo.database}.{finfo.table} WHERE hash IN (SELECT value FROM json_each(?))"
+                    for hash, value in con.execute(sql, param):
+                        result[feature].setdefault(hash, []).append(value)
+        return result
+
+    @contextmanager
+    def interruptible(self, con, timeout=None, cancel=None):
+        """Abort statements running on *con* within the block by timeout or cancellation.
+
+        A progress handler is installed on the connection for the duration of the block.
+        The resulting ``interrupted`` errors are raised as :py:exc:`QueryInterruptedException`.
+
+        Args:
+            con (sqlite3.Connection): Connection the statements run on.
+            timeout (float | None): Maximum runtime in seconds.
+            cancel (CancellationToken | None): Token that aborts the statements when cancelled.
+        """
+        if timeout is None and cancel is None:
+            yield
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def cancelled():
+            return cancel is not None and cancel.is_cancelled()
+
+        def expired():
+            return deadline is not None and time.monotonic() > deadline
+
+        if cancelled():
+            raise QueryInterruptedException("Query cancelled")
+        con.set_progress_handler(lambda: cancelled() or expired(), Database.PROGRESS_STEPS)
+        try:
+            yield
+        except sqlite3.OperationalError as err:
+            if cancelled():
+                raise QueryInterruptedException("Query cancelled") from err
+            if expired():
+                raise QueryInterruptedException(f"Query timed out after {timeout} seconds") from err
+            raise
+        finally:
+            con.set_progress_handler(None, 0)
+
+    def execute(self, q, params=()):
         """Execute a raw SQL DDL/DML statement and optionally auto-commit.
 
         Args:
             q (str): SQL statement (e.g. INSERT, UPDATE, ALTER TABLE, CREATE TABLE).
+            params (tuple): Values bound to the ``?`` placeholders in *q*.
+
+        Returns:
+            int: Number of rows modified by the statement (``-1`` for DDL).
         """
         if self.verbose:
             eprint(q)
-        self.cursor.execute(q)
-        if self.autocommit:
-            self.commit()
-
+        with self.lock:
+            self.cursor.execute(q, params)
+            rowcount = self.cursor.rowcount
+            if self.autocommit:
+                self.commit()
+        return rowcount
+
+    @retry_locked
     def commit(self):
-        self.connection.commit()
+        """Commit the main connection; a no-op inside :py:meth:`transaction`."""
+        if not self.depth:
+            self.connection.commit()
+
+    @retry_locked
+    def begin(self, dbnames=()):
+        """Start a (deferred) transaction unless one is open and take the write locks of *dbnames*.
+
+        ``BEGIN IMMEDIATE`` would lock every attached database file, so writers to
+        different databases would block each other.  Instead, only the databases that
+        are written are locked upfront (see :py:meth:`Schema.reserve`); the transaction
+        then waits for other writers of these files (busy timeout, then retries) before
+        it does any work, instead of failing when it upgrades from reading to writing.
+        """
+        started = not self.connection.in_transaction
+        if started:
+            self.connection.execute("BEGIN")
+        try:
+            for dbname in dbnames:
+                if dbname not in self.reserved:
+                    self.schemas[dbname].reserve()
+                    self.reserved.add(dbname)
+        except sqlite3.OperationalError:
+            if started:
+                # release the read lock before retrying, or a writer waiting for it cannot commit
+                self.connection.rollback()
+                self.reserved.clear()
+            raise
+
+    @contextmanager
+    def transaction(self, *dbnames):
+        """Run the enclosed statements on the main connection in one transaction.
+
+        Transactions nest: only the outermost block commits, and an exception rolls
+        back everything since the outermost :py:meth:`begin`.  Intermediate commits
+        (e.g. by autocommit) are suppressed.  The main connection stays locked
+        throughout.  The write locks of *dbnames* are taken on entry, those of other
+        databases on their first write.  Locked databases are retried on begin and
+        commit (see :py:func:`retry_locked`).
+
+        Example::
+
+            with db.transaction("meta"):
+                db.delete("local", values=stale)
+                db.delete_hashes_entirely(hashes, "meta")
+        """
+        with self.lock:
+            try:
+                self.begin(dbnames)
+            except sqlite3.OperationalError:
+                if not self.depth:
+                    self.end(rollback=True)
+                raise
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if not self.depth:
+                    self.end(rollback=True)
+                raise
+            self.depth -= 1
+            if not self.depth:
+                try:
+                    self.commit()
+                except sqlite3.OperationalError:
+                    self.end(rollback=True)
+                    raise
+                self.end()
+
+    def end(self, rollback=False):
+        """Finish the outermost transaction: forget its write locks and, on *rollback*, undo it."""
+        self.reserved.clear()
+        if rollback:
+            self.connection.rollback()
+            self.refresh_features()
+
+    @contextmanager
+    def batch(self):
+        """Defer all writes of the enclosed block to one commit.
+
+        The outermost block is a :py:meth:`transaction` spanning all attached
+        databases, so autocommits are suppressed and SQLite syncs the files once, at
+        the end.  The commit is atomic per database file only: in WAL journal mode,
+        SQLite does not commit several attached databases atomically.  Nested blocks run in a ``SAVEPOINT``: an exception rolls back the
+        writes of the innermost block only and is re-raised; if the caller handles it,
+        the enclosing block continues and commits the rest.  The feature registries
+        are restored to their state at the start of the nested block, as DDL of the
+        still open transaction is not visible to :py:meth:`refresh_features`.
+
+        Pooled readers do not see the deferred writes before the outermost block
+        commits.
+
+        Example::
+
+            with db.batch():
+                db.set_values({"family": "hardware"}, hashes)
+                with db.batch():
+                    db.set_values({"result": "sat"}, solved)
+        """
+        with self.lock:
+            if not self.depth:
+                with self.transaction():
+                    yield self
+                return
+            self.savepoints += 1
+            name = f"gbd_batch_{self.savepoints}"
+            registries = {dbname: copy.deepcopy(schema.features) for dbname, schema in self.schemas.items()}
+            self.connection.execute(f"SAVEPOINT {name}")
+            try:
+                with self.transaction():
+                    yield self
+            except BaseException:
+                self.connection.execute(f"ROLLBACK TO {name}")
+                self.connection.execute(f"RELEASE {name}")
+                for dbname, features in registries.items():
+                    self.schemas[dbname].features = features
+                self.features = self.init_features()
+                raise
+            else:
+                self.connection.execute(f"RELEASE {name}")
+            finally:
+                self.savepoints -= 1
+
+    def refresh_features(self):
+        """Re-read the feature registries from the database files, e.g. after a rollback of DDL."""
+        for schema in self.schemas.values():
+            if not schema.is_in_memory():
+                schema.features = Schema.features_from_database(schema.dbname, schema.path, schema.dbcon)
+        self.features = self.init_features()
 
     def set_auto_commit(self, autocommit):
         self.autocommit = autocommit
@@ -393,20 +757,21 @@ class Database:
                 and bypass name validation (for internal use by initialisers).
         """
         db = target_db or self.maindb
-        created = self.schemas[db].create_feature(name, default_value, permissive)
-        for finfo in created:
-            if not finfo.name in self.features.keys():
-                self.features[finfo.name] = [finfo]
-            else:
-                # this code disregards feature precedence by database position:
-                self.features[finfo.name].append(finfo)
+        with self.transaction(db):
+            created = self.schemas[db].create_feature(name, default_value, permissive)
+            for finfo in created:
+                if not finfo.name in self.features.keys():
+                    self.features[finfo.name] = [finfo]
+                else:
+                    # this code disregards feature precedence by database position:
+                    self.features[finfo.name].append(finfo)
 
     def set_values(self, mappings, hashes, target_db=None):
         """Set multiple feature values on the given hashes in one batch.
 
         ``mappings`` is a ``{feature_name: value}`` dict. Features are grouped by their
-        database, and each database's unique (1:1) features are written in a single SQL
-        statement (see :py:meth:`Schema.set_values`).
+        database, and each database's unique (1:1) features are upserted with one
+        multi-column statement per hash (see :py:meth:`Schema.write_rows`).
 
         The batched multi-value interface was contributed by Christoph Jabs (chrjabs,
         PR #39) to make feature extraction dramatically faster.
@@ -421,8 +786,147 @@ class Database:
         for fname, value in mappings.items():
             finfo = self.finfo(fname, target_db)
             db_mappings.setdefault(finfo.database, {})[fname] = value
-        for database, database_mappings in db_mappings.items():
-            self.schemas[database].set_values(database_mappings, hashes)
+        with self.transaction(*db_mappings):
+            for database, database_mappings in db_mappings.items():
+                self.schemas[database].set_values(database_mappings, hashes)
+
+    def set_values_bulk(self, rows, target_db=None):
+        """Write many ``(hash, feature, value)`` triples with parameterised ``executemany``.
+
+        Triples are consumed in chunks of :py:attr:`Schema.BULK_CHUNK`, grouped by the
+        database of their feature and written by :py:meth:`Schema.write_rows`, all in
+        one :py:meth:`transaction`.
+
+        Args:
+            rows (Iterable[tuple]): ``(hash, feature, value)`` triples.
+            target_db (str | None): Target database; uses each feature's registered
+                database when ``None``.
+
+        Raises:
+            DatabaseException: If a feature does not exist (or not in *target_db*).
+        """
+        databases = dict()  # feature -> database
+        with self.transaction():
+            for chunk in slice_iterator(rows, Schema.BULK_CHUNK):
+                db_rows = dict()
+                for row in chunk:
+                    fname = row[1]
+                    if fname not in databases:
+                        databases[fname] = self.finfo(fname, target_db).database
+                    db_rows.setdefault(databases[fname], []).append(row)
+                for database, database_rows in db_rows.items():
+                    with self.transaction(database):
+                        self.schemas[database].write_rows(database_rows)
+
+    def temp_hashes(self, name, sql):
+        """(Re-)create the TEMP table *name* and fill it with the hashes selected by *sql*.
+
+        The selection is evaluated entirely inside SQLite, so large query results are
+        never materialised in Python.
+
+        Args:
+            name (str): Name of the TEMP table.
+            sql (str): SQL SELECT statement whose first column yields hashes, e.g. the
+                output of :py:meth:`GBDQuery.build_query`.
+
+        Returns:
+            str: Qualified table address, e.g. ``"temp._gbd_selection"``.
+        """
+        self.execute(f"DROP TABLE IF EXISTS temp.{name}")
+        self.execute(f"CREATE TEMP TABLE {name} (hash TEXT PRIMARY KEY)")
+        self.execute(f"INSERT OR IGNORE INTO temp.{name} (hash) {sql}")
+        return f"temp.{name}"
+
+    def temp_values(self, name, column, values):
+        """(Re-)create the TEMP table *name* with the single column *column* holding *values*.
+
+        The values are bound as parameters, so arbitrarily many values never reach the
+        SQL text.
+
+        Args:
+            name (str): Name of the TEMP table.
+            column (str): Name of its (primary key) column.
+            values (Iterable[str]): Values to insert; duplicates are ignored.
+
+        Returns:
+            str: Qualified table address, e.g. ``"temp._gbd_hashes"``.
+        """
+        self.execute(f"DROP TABLE IF EXISTS temp.{name}")
+        self.execute(f"CREATE TEMP TABLE {name} ({column} TEXT PRIMARY KEY)")
+        with self.lock:
+            self.cursor.executemany(f"INSERT OR IGNORE INTO temp.{name} ({column}) VALUES (?)", ((v,) for v in values))
+        return f"temp.{name}"
+
+    def set_values_from_query(self, mappings, sql, target_db=None):
+        """Set feature values on all hashes selected by *sql* with set-based statements.
+
+        Unlike :py:meth:`set_values`, the hashes are not passed in from Python: they are
+        selected into a TEMP table and written with ``INSERT ... SELECT``.
+
+        * **1:n features**: ``INSERT OR IGNORE`` of ``(hash, value)`` pairs, followed by
+          an update of the mirror column in ``features``.
+        * **1:1 features**: ``INSERT ... SELECT ... ON CONFLICT (hash) DO UPDATE``.
+
+        Args:
+            mappings (dict): Mapping of feature name to value.
+            sql (str): SQL SELECT statement whose first column yields hashes.
+            target_db (str | None): Target database; uses each feature's registered
+                database when ``None``.
+
+        Returns:
+            dict[str, int]: Number of inserted or updated rows per feature.
+        """
+        finfos = {fname: self.finfo(fname, target_db) for fname in mappings}
+        with self.transaction(*{finfo.database for finfo in finfos.values()}):
+            selection = self.temp_hashes("_gbd_selection", sql)
+            counts = {}
+            for fname, value in mappings.items():
+                finfo = finfos[fname]
+                db = finfo.database
+                if finfo.default is None:
+                    counts[fname] = self.execute(f"INSERT OR IGNORE INTO {db}.{finfo.table} (hash, value) SELECT hash, ? FROM {selection}", (value,))
+                    self.execute(f"UPDATE {db}.features SET {finfo.table} = hash WHERE hash IN (SELECT hash FROM {selection})")
+                else:
+                    counts[fname] = self.execute(
+                        f"INSERT INTO {db}.features (hash, {finfo.column}) SELECT hash, ? FROM {selection} WHERE true "
+                        f"ON CONFLICT (hash) DO UPDATE SET {finfo.column} = excluded.{finfo.column}",
+                        (value,),
+                    )
+            self.execute(f"DROP TABLE {selection}")
+        return counts
+
+    def set_journal_mode(self, mode):
+        """Set the journal *mode* (e.g. ``"wal"``) of all writable database files.
+
+        In-memory (CSV) schemas and files without write access (WAL also needs a
+        writable directory) keep their mode.
+
+        Raises:
+            DatabaseException: If *mode* is not a valid journal mode.
+        """
+        if mode.lower() not in self.JOURNAL_MODES:
+            raise DatabaseException(f"Invalid journal mode '{mode}', use one of {self.JOURNAL_MODES}")
+        for dbname in self.get_databases():
+            if self.is_writable(dbname):
+                self.pragma(f"{dbname}.journal_mode = {mode.lower()}")
+
+    def is_writable(self, dbname):
+        """Return ``True`` if *dbname* is a database file that this process can write.
+
+        In-memory (CSV) schemas are not writable: changes would not persist.  Also
+        requires write access to the directory, which holds SQLite's journal files.
+        """
+        schema = self.schemas[dbname]
+        directory = os.path.dirname(os.path.abspath(schema.path))
+        return not schema.is_in_memory() and os.access(schema.path, os.W_OK) and os.access(directory, os.W_OK)
+
+    @retry_locked
+    def pragma(self, statement):
+        """Run ``PRAGMA statement`` on the main connection and return its result rows."""
+        if self.verbose:
+            eprint(f"PRAGMA {statement}")
+        with self.lock:
+            return self.connection.execute(f"PRAGMA {statement}").fetchall()
 
     def rename_feature(self, fname, new_fname, target_db=None):
         """Rename feature *fname* to *new_fname* in its database.
@@ -437,12 +941,10 @@ class Database:
         """
         Schema.valid_feature_or_raise(new_fname)
         finfo = self.finfo(fname, target_db)
-        self.execute(f"ALTER TABLE {finfo.database}.features RENAME COLUMN {fname} TO {new_fname}")
-        if finfo.default is None:
-            con = sqlite3.connect(self.schemas[finfo.database].path)
-            with con as cursor:
-                cursor.execute(f"ALTER TABLE {fname} RENAME TO {new_fname}")
-            con.close()
+        with self.transaction(finfo.database):
+            self.execute(f"ALTER TABLE {finfo.database}.features RENAME COLUMN {fname} TO {new_fname}")
+            if finfo.default is None:
+                self.execute(f"ALTER TABLE {finfo.database}.{fname} RENAME TO {new_fname}")
         self.features[fname].remove(finfo)
         if not len(self.features[fname]):
             del self.features[fname]
@@ -496,6 +998,9 @@ class Database:
         ``'None'``.
         For **1:1 features**: resets the column to its default value for matching hashes.
 
+        The filters are loaded into TEMP tables, so the deletion takes a constant
+        number of set-based statements, all in one :py:meth:`transaction`.
+
         Args:
             fname (str): Feature name.
             values (list[str]): Value filter; empty list means no value restriction.
@@ -503,46 +1008,98 @@ class Database:
             target_db (str | None): Restrict to this database when ambiguous.
         """
         finfo = self.finfo(fname, target_db)
-        v_joined = "', '".join(values)
-        h_joined = "', '".join(hashes)
-        w1 = f"{finfo.column} IN ('{v_joined}')"
-        w2 = f"hash IN ('{h_joined}')"
-        where = f"{w1 if len(values) else '1=1'} AND {w2 if len(hashes) else '1=1'}"
         db = finfo.database
-        if finfo.default is None:
-            hashlist = [r[0] for r in self.query(f"SELECT DISTINCT(hash) FROM {db}.{fname} WHERE {where}")]
-            self.execute(f"DELETE FROM {db}.{fname} WHERE {where}")
-            hl_joined = "', '".join(hashlist)
-            remaining = [
-                r[0] for r in self.query(f"SELECT DISTINCT(hash) FROM {db}.{fname} WHERE hash in ('{hl_joined}')")
-            ]
-            setnone = [h for h in hashlist if not h in remaining]
-            sn_joined = "', '".join(setnone)
-            self.execute(f"UPDATE {db}.features SET {fname} = 'None' WHERE hash IN ('{sn_joined}')")
-        else:
-            self.execute(f"UPDATE {db}.features SET {fname} = '{finfo.default}' WHERE {where}")
+        with self.transaction(db):
+            temps = []
+            where = []
+            if len(values):
+                temps.append(self.temp_values("_gbd_values", "value", values))
+                # unary plus: with both filters, probe the (hash, value) index by hash only
+                # instead of by the cross product of hashes and values
+                where.append(f"+{finfo.column} IN (SELECT value FROM {temps[-1]})" if len(hashes) else f"{finfo.column} IN (SELECT value FROM {temps[-1]})")
+            if len(hashes):
+                temps.append(self.temp_values("_gbd_hashes", "hash", hashes))
+                where.append(f"hash IN (SELECT hash FROM {temps[-1]})")
+            where = " AND ".join(where) or "1=1"
+            if finfo.default is None:
+                temps.append(self.temp_hashes("_gbd_affected", f"SELECT DISTINCT hash FROM {db}.{fname} WHERE {where}"))
+                self.execute(f"DELETE FROM {db}.{fname} WHERE {where}")
+                self.execute(
+                    f"UPDATE {db}.features SET {fname} = 'None' WHERE hash IN (SELECT hash FROM {temps[-1]}) "
+                    f"AND hash NOT IN (SELECT hash FROM {db}.{fname})"
+                )
+            else:
+                self.execute(f"UPDATE {db}.features SET {fname} = ? WHERE {where}", (finfo.default,))
+            for temp in temps:
+                self.execute(f"DROP TABLE {temp}")
+
+    def delete_hashes_entirely(self, hashes, target_db=None, all_databases=False):
+        """Delete all rows of *hashes* from every table of *target_db* in one transaction.
 
-    def delete_hashes_entirely(self, hashes, target_db=None):
-        tables = self.get_tables([target_db])
-        h_joined = "', '".join(hashes)
-        for table in tables:
-            self.execute(f"DELETE FROM {target_db}.{table} WHERE hash IN ('{h_joined}')")
+        The hashes are loaded once into a TEMP table, which every ``DELETE`` joins
+        against through the hash index of the table.
 
-    def copy_feature(self, old_name, new_name, target_db, hashlist=[]):
-        """Copy values from *old_name* into *new_name* for the given hashes.
+        Args:
+            hashes (Iterable[str]): Benchmark hashes to delete.
+            target_db (str | None): Database to delete from; defaults to the first database.
+            all_databases (bool): Delete from every writable database instead (see
+                :py:meth:`is_writable`); *target_db* is ignored.
 
-        *new_name* must already exist in *target_db*.
+        Returns:
+            dict[str, int]: Number of deleted rows per ``database.table``.
+        """
+        dbs = [db for db in self.get_databases() if self.is_writable(db)] if all_databases else [target_db or self.maindb]
+        counts = dict()
+        with self.transaction(*dbs):
+            selection = self.temp_values("_gbd_hashes", "hash", hashes)
+            for db in dbs:
+                for table in sorted(self.get_tables([db])):
+                    counts[f"{db}.{table}"] = self.execute(f"DELETE FROM {db}.{table} WHERE hash IN (SELECT hash FROM {selection})")
+            self.execute(f"DROP TABLE {selection}")
+        return counts
+
+    def copy_feature(self, old_name, new_name, target_db=None, sql=None):
+        """Copy values from *old_name* into *new_name* with set-based statements.
+
+        *new_name* must already exist in *target_db*.  The copy runs inside SQLite, also
+        across attached databases, in one :py:meth:`transaction`:
+
+        * **1:n target**: ``INSERT OR IGNORE ... SELECT`` of all ``(hash, value)``
+          pairs, followed by a bulk update of the mirror column in ``features``.
+        * **1:1 target**: ``INSERT ... SELECT ... ON CONFLICT (hash) DO UPDATE``; a
+          1:n source contributes its smallest value per hash.
 
         Args:
-            old_name (str): Source feature name.
+            old_name (str): Source feature identifier (see :py:meth:`find`).
             new_name (str): Destination feature name.
-            target_db (str): Database for the destination feature.
-            hashlist (list[str]): Restrict the copy to these hashes.
+            target_db (str | None): Database of the destination feature.
+            sql (str | None): SQL SELECT statement whose first column yields the hashes
+                to copy, e.g. the output of :py:meth:`GBDQuery.build_query`; copies all
+                hashes if ``None``.
+
+        Returns:
+            int: Number of inserted or updated rows.
         """
         old_finfo = self.find(old_name)
-        hl_joined = "', '".join(hashlist)
-        data = self.query(
-            f"SELECT hash, {old_finfo.column} FROM {old_finfo.database}.{old_finfo.table} WHERE hash IN ('{hl_joined}')"
-        )
-        for hash, value in data:
-            self.set_values(new_name, value, [hash], target_db)
+        new_finfo = self.finfo(new_name, target_db)
+        source = f"{old_finfo.database}.{old_finfo.table}"
+        db = new_finfo.database
+        with self.transaction(db):
+            where = "hash != 'None'"
+            if sql is not None:
+                selection = self.temp_hashes("_gbd_selection", sql)
+                where += f" AND hash IN (SELECT hash FROM {selection})"
+            if new_finfo.default is None:
+                count = self.execute(f"INSERT OR IGNORE INTO {db}.{new_finfo.table} (hash, value) SELECT hash, {old_finfo.column} FROM {source} WHERE {where}")
+                self.execute(
+                    f"UPDATE {db}.features SET {new_finfo.table} = hash WHERE {new_finfo.table} != hash "
+                    f"AND hash IN (SELECT hash FROM {db}.{new_finfo.table})"
+                )
+            else:
+                count = self.execute(
+                    f"INSERT INTO {db}.features (hash, {new_finfo.column}) SELECT hash, min({old_finfo.column}) FROM {source} WHERE {where} "
+                    f"GROUP BY hash ON CONFLICT (hash) DO UPDATE SET {new_finfo.column} = excluded.{new_finfo.column}"
+                )
+            if sql is not None:
+                self.execute(f"DROP TABLE {selection}")
+        return count
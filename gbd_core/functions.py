@@ -0,0 +1,158 @@
+# MIT License
+
+# Copyright (c) 2025 Ashlin Iser, Karlsruhe Institute of Technology (KIT)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+import collections
+import functools
+import math
+import re
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """Compile *pattern* once; repeated REGEXP calls of a query hit this cache."""
+    return re.compile(pattern)
+
+
+def regexp(pattern, value):
+    """Implementation of SQLite's ``value REGEXP pattern`` (called as ``regexp(pattern, value)``)."""
+    if pattern is None or value is None:
+        return None
+    return compile_pattern(pattern).search(str(value)) is not None
+
+
+def numeric(value):
+    """Return *value* as float, or ``None`` if it is not numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Quantile:
+    """Aggregate ``quantile(value, p)``: the *p*-quantile of the numeric values of a group.
+
+    Linear interpolation between the closest ranks (as ``numpy.quantile``); non-numeric
+    values are ignored.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.p = None
+
+    def step(self, value, p=0.5):
+        self.p = p
+        value = numeric(value)
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        if not self.values or self.p is None or not 0 <= self.p <= 1:
+            return None
+        self.values.sort()
+        pos = (len(self.values) - 1) * self.p
+        lower = int(pos)
+        upper = min(lower + 1, len(self.values) - 1)
+        return self.values[lower] + (self.values[upper] - self.values[lower]) * (pos - lower)
+
+
+class Median(Quantile):
+    """Aggregate ``median(value)``: the median of the numeric values of a group."""
+
+    def step(self, value):
+        super().step(value, 0.5)
+
+
+class Mode:
+    """Aggregate ``mode(value)``: the most frequent value of a group (the smallest one on ties)."""
+
+    def __init__(self):
+        self.counter = collections.Counter()
+
+    def step(self, value):
+        if value is not None:
+            self.counter[str(value)] += 1
+
+    def finalize(self):
+        if not self.counter:
+            return None
+        top = max(self.counter.values())
+        return min(value for value, count in self.counter.items() if count == top)
+
+
+class StdDev:
+    """Aggregate ``stddev(value)``: the population standard deviation of the numeric values of a group.
+
+    Single pass with Welford's algorithm; non-numeric values are ignored.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        value = numeric(value)
+        if value is not None:
+            self.n += 1
+            delta = value - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        return math.sqrt(self.m2 / self.n) if self.n else None
+
+
+STATISTIC = re.compile(r"^(?:(median|mode|stddev)|quantile\(\s*([0-9]*\.?[0-9]+)\s*\)|p(100|[0-9]{1,2}))$")
+
+
+def statistic_sql(collapse, column):
+    """Return the aggregate expression of the statistic *collapse* function over *column*.
+
+    Statistic collapse functions are ``median``, ``mode``, ``stddev``, ``quantile(p)``
+    with ``0 <= p <= 1``, and the percentile shorthand ``pNN`` (e.g. ``p90`` for
+    ``quantile(0.9)``).
+
+    Args:
+        collapse (str): Collapse function name.
+        column (str): SQL column expression.
+
+    Returns:
+        str | None: SQL expression, or ``None`` if *collapse* is not a statistic.
+
+    Raises:
+        ValueError: If the quantile is not within ``[0, 1]``.
+    """
+    match = STATISTIC.match(collapse.lower())
+    if match is None:
+        return None
+    name, p, percentile = match.groups()
+    if name is not None:
+        return f"{name}({column})"
+    p = float(p) if p is not None else int(percentile) / 100
+    if not 0 <= p <= 1:
+        raise ValueError(f"Quantile {p} is not within [0, 1]")
+    return f"quantile({column}, {p})"
+
+
+def register_functions(connection):
+    """Register GBD's user-defined SQL functions on *connection*.
+
+    Functions are marked deterministic, so SQLite may factor constant
+    sub-expressions out of loops and use them in indexes.
+    """
+    connection.create_function("regexp", 2, regexp, deterministic=True)
+    connection.create_aggregate("median", 1, Median)
+    connection.create_aggregate("quantile", 2, Quantile)
+    connection.create_aggregate("mode", 1, Mode)
+    connection.create_aggregate("stddev", 1, StdDev)
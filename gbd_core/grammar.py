@@ -13,9 +13,11 @@
 # copies or substantial portions of the Software.
 
 import json
+import re
 
 import tatsu
 
+from gbd_core import util
 from gbd_core.database import Database, DatabaseException
 
 
@@ -33,6 +35,14 @@ class Parser:
     - Boolean logic: ``and``, ``or``, ``not``
     - Comparisons: ``=``, ``!=``, ``<``, ``>``, ``<=``, ``>=``
     - Pattern matching: ``like`` / ``unlike`` with optional leading/trailing ``%`` wildcard
+    - Regular expressions: ``feature regexp pattern`` (Python ``re`` syntax, unanchored
+      search; quote patterns that contain whitespace or parentheses)
+    - Set membership: ``feature in (a, b, c)``
+    - Ranges: ``feature between x and y`` (numeric if both bounds are numbers, else lexical)
+    - Aggregates over the values of a feature: ``count(feature) >= 3``, ``min(feature) < 10``,
+      ``max(...)``, ``avg(...)`` compared with a number
+    - Parameters: ``feature = $name`` (any comparison operator) is compiled to the SQL
+      parameter ``:name``, see :py:attr:`params` and :py:meth:`GBD.prepare`
     - Feature references: ``feature``, ``context:feature``, or ``database:feature``
     - Right-hand side: unquoted or single/double-quoted strings, integers/floats, or
       parenthesised arithmetic terms (``+``, ``-``, ``*``, ``/``)
@@ -70,10 +80,15 @@ class Parser:
 
         constraint 
             = 
+            | agg:("count" | "min" | "max" | "avg") "(" col:(dbname ":" column | column) ")" cop:("=" | "!=" | "<=" | ">=" | "<" | ">" ) ~ num:number
             | col:(dbname ":" column | column) cop:("=" | "!=" | "<=" | ">=" | "<" | ">" ) ter:termstart
             | col:(dbname ":" column | column) cop:("=" | "!=" | "<=" | ">=" | "<" | ">" ) num:number 
+            | col:(dbname ":" column | column) cop:("=" | "!=" | "<=" | ">=" | "<" | ">" ) par:param
             | col:(dbname ":" column | column) cop:("=" | "!=" | "<=" | ">=" | "<" | ">" ) str:string 
             | col:(dbname ":" column | column) cop:("like" | "unlike") ~ pre:["%"] lik:string suf:["%"]
+            | col:(dbname ":" column | column) cop:"regexp" ~ reg:pattern
+            | col:(dbname ":" column | column) cop:"in" ~ "(" lst:",".{listitem}+ ")"
+            | col:(dbname ":" column | column) cop:"between" ~ low:(number | string) "and" high:(number | string)
             ;
 
         termstart 
@@ -96,6 +111,22 @@ class Parser:
             | /[a-zA-Z0-9_\.\-\/\,\:\+\=\@]+/
             ;
 
+        pattern
+            =
+            | "'" @:/[^']*/ "'"
+            | '"' @:/[^"]*/ '"'
+            | /[^\s'"()]+/
+            ;
+
+        listitem
+            =
+            | "'" @:singlequotedstring "'"
+            | '"' @:doublequotedstring '"'
+            | /[a-zA-Z0-9_\.\-\/\:\+\=\@]+/
+            ;
+
+        param = /\$[a-zA-Z_][a-zA-Z0-9_]*/ ;
+
         # number = /[-]?[0-9]+[.]?[0-9]*/ ;
         number = /[-]?[0-9]+(?:\.[0-9]+)?(?![A-Za-z0-9_])/ ;
         singlequotedstring = /[a-zA-Z0-9_\.\-\/\,\:\+\=\@\s"\*\\]+/ ;
@@ -106,6 +137,10 @@ class Parser:
 
     model = tatsu.compile(GRAMMAR)
 
+    # IN-lists longer than this are passed to SQLite as a single JSON literal and
+    # unpacked with json_each() instead of being spelled out term by term.
+    IN_LIST_INLINE_MAX = 64
+
     def __init__(self, query, verbose=False):
         """Parse *query* into an internal AST.
 
@@ -117,6 +152,8 @@ class Parser:
         Raises:
             ParserException: If *query* is syntactically invalid.
         """
+        # parameter name -> True if it is bound as a number (filled by get_sql)
+        self.params = dict()
         try:
             self.ast = Parser.model.parse(query) if query else dict()
             if verbose:
@@ -125,6 +162,35 @@ class Parser:
         except tatsu.exceptions.FailedParse as e:
             raise ParserException(f"Failed to parse query: {str(e)}") from e
 
+    @classmethod
+    def sql_string(cls, value):
+        """Return *value* as a quoted SQL string literal."""
+        return "'" + str(value).replace("'", "''") + "'"
+
+    @classmethod
+    def sql_value_set(cls, values):
+        """Return the right-hand side of an SQL ``IN`` operator for *values*.
+
+        Short lists are spelled out as literals; long lists are passed as one JSON
+        array literal and unpacked by ``json_each``, which keeps the SQL compact
+        and lets SQLite build a single ephemeral index for the membership test.
+        """
+        if len(values) <= cls.IN_LIST_INLINE_MAX:
+            return "(" + ", ".join(cls.sql_string(v) for v in values) + ")"
+        return f"(SELECT value FROM json_each({cls.sql_string(json.dumps(list(values)))}))"
+
+    @classmethod
+    def compare(cls, left, operator, right):
+        """Evaluate the comparison *left* *operator* *right* in Python."""
+        return {
+            "=": left == right,
+            "!=": left != right,
+            "<=": left <= right,
+            ">=": left >= right,
+            "<": left < right,
+            ">": left > right,
+        }[operator]
+
     def get_features(self, ast=None):
         """Return the set of feature names referenced anywhere in the query.
 
@@ -181,6 +247,29 @@ class Parser:
           ``db.col.hash NOT IN (SELECT … WHERE CAST(db.col.value AS FLOAT) = expr)``
         * **1:n, term** ``col op (expr)`` (other ops) -> 
           ``CAST(db.col.value AS FLOAT) op expr``  *(any-row semantics - see Issues.md #3)*
+        * **regexp** ``col regexp ^foo`` -> ``db.features.col REGEXP '^foo'``, or for 1:n
+          features ``db.col.hash IN (SELECT … WHERE db.col.value REGEXP '^foo')``; the
+          ``REGEXP`` function is registered by :py:class:`Database`
+        * **in** ``col in (a, b)`` -> ``db.features.col IN ('a', 'b')``, or for 1:n
+          features a single ``db.col.hash IN (SELECT … WHERE db.col.value IN ('a', 'b'))``;
+          lists longer than :py:attr:`IN_LIST_INLINE_MAX` become
+          ``IN (SELECT value FROM json_each('["a", "b", …]'))``
+        * **between** ``col between 1 and 5`` -> ``CAST(db.features.col AS FLOAT) BETWEEN 1 AND 5``,
+          or ``db.features.col BETWEEN 1 AND 5`` if the column has ``INTEGER`` or ``REAL``
+          affinity (numeric CSV columns), such that an index on it can be used;
+          non-numeric bounds compare lexically (``db.features.col BETWEEN 'a' AND 'b'``)
+        * **parameter** ``col > $v`` -> ``CAST(db.features.col AS FLOAT) > :v`` and
+          ``col = $v`` -> ``db.features.col = :v``; numeric operators (``<``, ``<=``,
+          ``>``, ``>=``) take numbers, ``=`` and ``!=`` take strings (recorded in
+          :py:attr:`params`); 1:n features use ``IN`` / ``NOT IN`` subqueries as above
+        * **aggregate, 1:n** ``max(col) < 5`` ->
+          ``db.col.hash IN (SELECT hash FROM db.col WHERE hash != 'None' GROUP BY hash
+          HAVING max(CAST(value AS FLOAT)) < 5)``; ``count`` counts values.  If hashes
+          without values satisfy the condition (e.g. ``count(col) < 3``), the negated
+          condition is used with ``NOT IN``.
+        * **aggregate, 1:1** ``max(col) < 5`` -> ``CAST(db.features.col AS FLOAT) < 5``,
+          and ``count(col)`` is ``1``; this includes the columns of CSV sources, which
+          have no default value but are stored in the ``features`` table
 
         Args:
             db (Database): Used to resolve feature addresses and determine cardinality.
@@ -209,6 +298,21 @@ class Parser:
                 operator = "not like" if ast["cop"] == "unlike" else ast["cop"]
                 feat = db.faddr("".join(ast["col"]))
                 feat_is_1_n = db.find("".join(ast["col"])).default is None
+                if "agg" in ast:  # agg:("count" | "min" | "max" | "avg")
+                    aggregate = ast["agg"].lower()
+                    finfo = db.find("".join(ast["col"]))
+                    if not feat_is_1_n or finfo.table == "features":
+                        # 1:1 features and the columns of CSV sources
+                        value = "1" if aggregate == "count" else f"CAST({feat} AS FLOAT)"
+                        return f"{value} {operator} {ast['num']}"
+                    table = db.faddr_table("".join(ast["col"]))
+                    value = f"count({finfo.column})" if aggregate == "count" else f"{aggregate}(CAST({finfo.column} AS FLOAT))"
+                    condition = f"{value} {operator} {ast['num']}"
+                    setop = "IN"
+                    if aggregate == "count" and Parser.compare(0, ast["cop"], float(ast["num"])):
+                        # hashes without values satisfy the condition, exclude the others
+                        condition, setop = f"NOT ({condition})", "NOT IN"
+                    return f"{table}.hash {setop} (SELECT hash FROM {table} WHERE hash != 'None' GROUP BY hash HAVING {condition})"
                 if "str" in ast:  # cop:("=" | "!=")
                     if feat_is_1_n:
                         table = db.faddr_table("".join(ast["col"]))
@@ -220,6 +324,18 @@ class Parser:
                         table = db.faddr_table("".join(ast["col"]))
                         return f"{table}.hash IN (SELECT {table}.hash FROM {table} WHERE CAST({feat} AS FLOAT) {operator} {ast['num']})"
                     return f"CAST({feat} AS FLOAT) {operator} {ast['num']}"
+                if "par" in ast:  # cop:("=" | "!=" | "<=" | ">=" | "<" | ">" )
+                    name = ast["par"][1:]
+                    numeric = ast["cop"] not in ["=", "!="]
+                    if self.params.setdefault(name, numeric) != numeric:
+                        raise ParserException(f"Parameter '{name}' is used both as number and as string")
+                    value = f"CAST({feat} AS FLOAT)" if numeric else feat
+                    if feat_is_1_n:
+                        table = db.faddr_table("".join(ast["col"]))
+                        setop = "NOT IN" if ast["cop"] == "!=" else "IN"
+                        cop = "=" if ast["cop"] == "!=" else ast["cop"]
+                        return f"{table}.hash {setop} (SELECT {table}.hash FROM {table} WHERE {value} {cop} :{name})"
+                    return f"{value} {operator} :{name}"
                 if "lik" in ast:  # cop:("like" | "unlike")
                     if feat_is_1_n:
                         table = db.faddr_table("".join(ast["col"]))
@@ -228,6 +344,34 @@ class Parser:
                         return f"{table}.hash {setop} (SELECT {table}.hash FROM {table} WHERE {feat} like '{s}')"
                     s = (ast.get("pre") or "") + ast["lik"] + (ast.get("suf") or "")
                     return f"{feat} {operator} '{s}'"
+                if "reg" in ast:  # cop:("regexp")
+                    try:
+                        re.compile(ast["reg"])
+                    except re.error as e:
+                        raise ParserException(f"Invalid regular expression '{ast['reg']}': {e}") from e
+                    predicate = f"{feat} REGEXP {Parser.sql_string(ast['reg'])}"
+                    if feat_is_1_n:
+                        table = db.faddr_table("".join(ast["col"]))
+                        return f"{table}.hash IN (SELECT {table}.hash FROM {table} WHERE {predicate})"
+                    return predicate
+                if "lst" in ast:  # cop:("in")
+                    predicate = f"{feat} IN {Parser.sql_value_set(ast['lst'])}"
+                    if feat_is_1_n:
+                        table = db.faddr_table("".join(ast["col"]))
+                        return f"{table}.hash IN (SELECT {table}.hash FROM {table} WHERE {predicate})"
+                    return predicate
+                if "low" in ast:  # cop:("between")
+                    if util.is_number(ast["low"]) and util.is_number(ast["high"]):
+                        # columns of numeric affinity are compared without cast, so an index can be used
+                        numeric = db.find("".join(ast["col"])).type in ("INTEGER", "REAL")
+                        value = feat if numeric else f"CAST({feat} AS FLOAT)"
+                        predicate = f"{value} BETWEEN {ast['low']} AND {ast['high']}"
+                    else:
+                        predicate = f"{feat} BETWEEN {Parser.sql_string(ast['low'])} AND {Parser.sql_string(ast['high'])}"
+                    if feat_is_1_n:
+                        table = db.faddr_table("".join(ast["col"]))
+                        return f"{table}.hash IN (SELECT {table}.hash FROM {table} WHERE {predicate})"
+                    return predicate
                 if "ter" in ast:  # cop:("=" | "!=" | "<=" | ">=" | "<" | ">" )
                     if feat_is_1_n and ast["cop"] == "!=":
                         table = db.faddr_table("".join(ast["col"]))
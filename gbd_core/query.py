@@ -13,6 +13,7 @@
 # copies or substantial portions of the Software.
 
 
+from gbd_core import functions
 from gbd_core.database import Database, DatabaseException
 from gbd_core.grammar import Parser
 
@@ -55,7 +56,9 @@ class GBDQuery:
             self.db.find(feature)
 
     # Generate SQL Query from given GBD Query
-    def build_query(self, hashes=[], resolve=[], group_by=None, join_type="LEFT", collapse=None):
+    def build_query(
+        self, hashes=[], resolve=[], group_by=None, join_type="LEFT", collapse=None, hash_range=None, sort_by=[], limit=None, offset=None
+    ):
         """Build and return a complete SQL SELECT statement.
 
         Args:
@@ -68,25 +71,65 @@ class GBDQuery:
                 Cross-context joins are always ``INNER`` (see ``Issues.md`` #4).
             collapse (str | None): Aggregate function for resolved columns; one of
                 ``"group_concat"``, ``"min"``, ``"max"``, ``"avg"``, ``"count"``,
-                ``"sum"``.  ``None`` returns one raw row per join result.
+                ``"sum"``, ``"list"`` (JSON arrays, see :py:meth:`build_select`), or
+                a statistic: ``"median"``, ``"mode"``, ``"stddev"``, ``"quantile(p)"``, ``"pNN"``.
+                ``None`` returns one raw row per join result.
+            hash_range (tuple | None): ``(low, high)`` bounds on the group-by column,
+                *low* inclusive and *high* exclusive; either bound may be ``None``
+                (open).  Used to partition a query, see :py:meth:`partition_bounds`.
+            sort_by (list[tuple]): ``(feature, descending)`` pairs to order the result
+                by before the group-by column (see :py:meth:`build_orderby`).
+            limit (int | None): Maximum number of result rows.
+            offset (int | None): Number of result rows to skip.
 
         Returns:
             str: Ready-to-execute SQL query.
         """
         group = group_by or self.determine_group_by(resolve)
 
-        self.features_exist_or_throw(resolve + [group] + list(self.features))
+        sort_features = [feature for (feature, _) in sort_by]
+
+        self.features_exist_or_throw(resolve + [group] + list(self.features) + sort_features)
 
         sql_select = self.build_select(group, resolve, collapse)
 
-        sql_from = self.build_from(group, set(resolve) | self.features, join_type)
+        sql_from = self.build_from(group, set(resolve) | self.features | set(sort_features), join_type)
 
-        sql_where = self.build_where(hashes, group)
+        sql_where = self.build_where(hashes, group, hash_range)
 
         sql_groupby = f"GROUP BY {self.db.faddr(group)}" if collapse else ""
-        sql_orderby = f"ORDER BY {self.db.faddr(group)}"
+        sql_orderby = self.build_orderby(group, resolve, collapse, sort_by)
+
+        sql_limit = ""
+        if limit is not None or offset is not None:
+            sql_limit = f"LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset or 0)}"
+
+        return f"{sql_select} {sql_from} WHERE {sql_where} {sql_groupby} {sql_orderby} {sql_limit}".rstrip()
+
+    def partition_bounds(self, group, k):
+        """Split the value space of the group-by column into *k* ranges of similar size.
+
+        The bounds are taken from the sorted distinct values of the group-by column
+        (ignoring the filter), such that each range holds about the same number of groups.
 
-        return f"{sql_select} {sql_from} WHERE {sql_where} {sql_groupby} {sql_orderby}"
+        Args:
+            group (str): Feature identifier of the group-by column.
+            k (int): Number of partitions.
+
+        Returns:
+            list[tuple]: Up to *k* ``(low, high)`` ranges for :py:meth:`build_query`,
+                ordered, disjoint and covering the complete value space.
+        """
+        column = self.db.faddr(group)
+        table = self.db.faddr_table(group)
+        values = f"SELECT DISTINCT {column} FROM {table} WHERE {column} != 'None'"
+        [(n,)] = self.db.query(f"SELECT count(*) FROM ({values})")
+        bounds = []
+        for i in range(1, k):
+            rows = self.db.query(f"{values} ORDER BY {column} LIMIT 1 OFFSET {n * i // k}")
+            if len(rows) and (not bounds or bounds[-1] != rows[0][0]):
+                bounds.append(rows[0][0])
+        return list(zip([None] + bounds, bounds + [None]))
 
     def determine_group_by(self, resolve):
         """Return the default ``context:hash`` column used as the GROUP BY key.
@@ -112,7 +155,10 @@ class GBDQuery:
 
         When *collapse* is given, every selected column (including the group-by column)
         is wrapped with the aggregate function.  Without *collapse*, ``SELECT DISTINCT``
-        deduplicates rows.
+        deduplicates rows.  With ``collapse="list"``, each resolved column is aggregated
+        into a JSON array of its distinct values (as strings) by ``json_group_array``.
+        Statistic collapse functions (see :py:func:`functions.statistic_sql`) aggregate
+        all values without ``DISTINCT``, such that repeated values are weighted.
 
         The group-by column is also aggregated, which is redundant when ``GROUP BY`` is present (see ``Issues.md`` #6).
 
@@ -126,10 +172,60 @@ class GBDQuery:
             str: SQL SELECT clause, e.g.
                 ``"SELECT DISTINCT cnf_db.features.hash, cnf_db.local.value"``.
         """
+        return "SELECT DISTINCT " + ", ".join(self.select_expressions(group_by, resolve, collapse))
+
+    def select_expressions(self, group_by, resolve, collapse=None):
+        """Return the list of output column expressions of :py:meth:`build_select`."""
         result = [self.db.faddr(f) for f in [group_by] + resolve]
-        if collapse and collapse != "none":
+        statistic = collapse and functions.statistic_sql(collapse, "{}")
+        if statistic:
+            # statistics are taken over all values, the group-by column is unique per group
+            result = result[:1] + [statistic.format(r) for r in result[1:]]
+        elif collapse and collapse.lower() == "list":
+            # values as JSON array of strings, the group-by column is unique per group
+            result = result[:1] + [f"json_group_array(DISTINCT CAST({r} AS TEXT)) FILTER (WHERE {r} IS NOT NULL)" for r in result[1:]]
+        elif collapse and collapse != "none":
             result = [f"{collapse}(DISTINCT {r})" for r in result]
-        return "SELECT DISTINCT " + ", ".join(result)
+        return result
+
+    def build_orderby(self, group_by, resolve, collapse=None, sort_by=[]):
+        """Build the ORDER BY clause.
+
+        Each ``(feature, descending)`` pair in *sort_by* orders numerically first and
+        lexically second, as feature values are stored as text (non-numeric values
+        compare as ``0`` numerically).  Resolved features are sorted by their output
+        column (e.g. the collapsed value); other features, and resolved features whose
+        output is a JSON array (``"list"``) or a statistic, by their smallest
+        (ascending) or largest (descending) value per group if *collapse* is given.
+        The group-by column is always the last sort key, so the order is total.
+
+        Args:
+            group_by (str): Feature identifier of the group-by column.
+            resolve (list[str]): Resolved features (output columns).
+            collapse (str | None): Aggregate function name, or ``None``.
+            sort_by (list[tuple]): ``(feature, descending)`` pairs.
+
+        Returns:
+            str: SQL ORDER BY clause.
+        """
+        outputs = dict(zip([self.db.faddr(f) for f in [group_by] + resolve], self.select_expressions(group_by, resolve, collapse)))
+        if collapse and (collapse.lower() == "list" or functions.statistic_sql(collapse, "{}")):
+            # only the group-by column is sorted by its output
+            outputs = { self.db.faddr(group_by): outputs[self.db.faddr(group_by)] }
+        keys = []
+        for feature, descending in sort_by:
+            direction = "DESC" if descending else "ASC"
+            column = self.db.faddr(feature)
+            if column in outputs:
+                numeric, lexical = f"CAST({outputs[column]} AS REAL)", outputs[column]
+            elif collapse:
+                aggregate = "max" if descending else "min"
+                numeric, lexical = f"{aggregate}(CAST({column} AS REAL))", f"{aggregate}({column})"
+            else:
+                numeric, lexical = f"CAST({column} AS REAL)", column
+            keys.extend([f"{numeric} {direction}", f"{lexical} {direction}"])
+        keys.append(self.db.faddr(group_by))
+        return "ORDER BY " + ", ".join(keys)
 
     def find_translator_feature(self, source_context, target_context):
         """Find the 1:n translator feature that bridges two contexts.
@@ -219,7 +315,7 @@ class GBDQuery:
 
         return " ".join(result.values())
 
-    def build_where(self, hashes, group_by):
+    def build_where(self, hashes, group_by, hash_range=None):
         """Build the WHERE clause body.
 
         Combines three conditions with ``AND``:
@@ -229,10 +325,13 @@ class GBDQuery:
         2. The SQL fragment compiled from the GBD filter expression.
         3. An optional ``hash IN (...)`` restriction when *hashes* is non-empty.
 
+        If *hash_range* is given, the group-by column is additionally restricted to it.
+
         Args:
             hashes (list[str]): Benchmark hashes to restrict results to; empty list
                 means no hash restriction.
             group_by (str): Feature identifier of the group-by column.
+            hash_range (tuple | None): ``(low, high)`` bounds, low inclusive, high exclusive.
 
         Returns:
             str: SQL WHERE clause body (without the ``WHERE`` keyword).
@@ -243,4 +342,10 @@ class GBDQuery:
         if len(hashes):
             joined = "', '".join(hashes)
             result = result + f" AND {group_table}.hash in ('{joined}')"
+        if hash_range is not None:
+            low, high = hash_range
+            if low is not None:
+                result = result + f" AND {group_column} >= {Parser.sql_string(low)}"
+            if high is not None:
+                result = result + f" AND {group_column} < {Parser.sql_string(high)}"
         return result
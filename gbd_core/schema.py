@@ -13,14 +13,22 @@
 # copies or substantial portions of the Software.
 
 import csv
+import functools
+import hashlib
 import os
+import random
 import re
 import sqlite3
+import threading
+import time
 import typing
+from contextlib import contextmanager
 from dataclasses import dataclass
 
+import polars as pl
+
 from gbd_core import contexts
-from gbd_core.util import confirm
+from gbd_core.util import confirm, slice_iterator
 
 
 class SchemaException(Exception):
@@ -29,6 +37,134 @@ class SchemaException(Exception):
     pass
 
 
+def is_locked(err: sqlite3.OperationalError):
+    """Return ``True`` if *err* reports a database locked by another connection (``SQLITE_BUSY``/``SQLITE_LOCKED``)."""
+    code = getattr(err, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(err)
+
+
+def retry_locked(method):
+    """Retry *method* with exponential backoff while the database is locked.
+
+    The busy timeout of the connection already waits for locks; this handles the
+    remaining lock errors, e.g. after the timeout expired.  Up to ``self.retries``
+    retries are made, starting with a (jittered) delay of ``self.retry_delay``
+    seconds that doubles after each attempt.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        delay = self.retry_delay
+        for _ in range(self.retries):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as err:
+                if not is_locked(err):
+                    raise
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class CsvCache:
+    """On-disk cache of CSV data sources converted to SQLite files.
+
+    A converted CSV is stored as ``{path key}-{version key}.db``, where the path key
+    hashes the real path of the CSV and the version key its size, its modification time
+    and :py:attr:`FORMAT`.  A changed CSV or conversion therefore misses the cache, and
+    storing the new version removes the stale file.  Hits refresh the modification time of the cached file, and the least
+    recently used files are evicted once the cache exceeds *max_bytes*.
+
+    Configured by environment variables:
+
+    * ``GBD_CACHE``: cache directory (default ``$XDG_CACHE_HOME/gbd`` or
+      ``~/.cache/gbd``); ``none`` disables the cache.
+    * ``GBD_CACHE_SIZE``: maximum cache size in MB (default 1024).
+    """
+
+    # version of the CSV to SQLite conversion (Schema.features_from_csv), bump on changes
+    FORMAT = 2
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_environment(cls):
+        """Return the cache configured by the environment, or ``None`` if disabled."""
+        directory = os.environ.get("GBD_CACHE")
+        if directory is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            directory = os.path.join(base, "gbd")
+        elif not directory or directory.lower() == "none":
+            return None
+        return cls(directory, int(float(os.environ.get("GBD_CACHE_SIZE", 1024)) * 1024 * 1024))
+
+    @staticmethod
+    def digest(text):
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def entry(self, path):
+        """Return ``(path key, cache file)`` for the current version of the CSV at *path*."""
+        stat = os.stat(path)
+        prefix = self.digest(os.path.realpath(path))
+        return prefix, os.path.join(self.directory, f"{prefix}-{self.digest(f'{self.FORMAT}:{stat.st_size}:{stat.st_mtime_ns}')}.db")
+
+    def load(self, path, con):
+        """Copy the cached conversion of the CSV at *path* into *con*; return ``False`` on a miss."""
+        _, cached = self.entry(path)
+        if not os.path.isfile(cached):
+            return False
+        try:
+            src = sqlite3.connect(f"file:{cached}?mode=ro", uri=True)
+            try:
+                src.backup(con)
+            finally:
+                src.close()
+            os.utime(cached)
+        except (OSError, sqlite3.Error):
+            return False
+        return True
+
+    def store(self, path, con):
+        """Store the converted CSV in *con* for *path*, then remove stale and evict old files.
+
+        The file is written under a temporary name and renamed, so concurrent readers
+        never see a partial file.  Failures (e.g. a read-only cache directory) are ignored.
+        """
+        prefix, cached = self.entry(path)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            dst = sqlite3.connect(tmp)
+            try:
+                con.backup(dst)
+            finally:
+                dst.close()
+            os.replace(tmp, cached)
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix) and name.endswith(".db") and os.path.join(self.directory, name) != cached:
+                    os.remove(os.path.join(self.directory, name))
+            self.evict(keep=cached)
+        except (OSError, sqlite3.Error):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def evict(self, keep=None):
+        """Remove least recently used cache files until the cache fits into *max_bytes*."""
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".db")]
+        files = sorted(((os.stat(f).st_mtime, os.stat(f).st_size, f) for f in files), reverse=True)
+        total = 0
+        for _, size, file in files:
+            total += size
+            if total > self.max_bytes and file != keep:
+                os.remove(file)
+
+
 @dataclass
 class FeatureInfo:
     """Metadata descriptor for a single GBD feature.
@@ -53,12 +189,15 @@ class FeatureInfo:
         column (str): Column within *table* that holds the value.
             1:1 -> equals *name*; 1:n -> ``"value"``.
         default (str | None): SQLite default value, or ``None`` for 1:n features.
+        type (str | None): Declared SQLite type of *column* (e.g. ``"TEXT"``, or
+            ``"INTEGER"`` / ``"REAL"`` for numeric CSV columns), if known.
     """
     name: str = None
     database: str = None
     table: str = None
     column: str = None
     default: str = None
+    type: str = None
 
 
 class Schema:
@@ -80,12 +219,26 @@ class Schema:
     in sync.  A sentinel row ``(hash='None', value='None')`` is present in every 1:n
     table (see ``Issues.md`` #7).
 
+    **Connections and transactions**
+
+    All DDL and DML runs on one long-lived connection: the schema's own
+    :py:attr:`dbcon`, or the hub connection of a :py:class:`Database` after
+    :py:meth:`bind`.  Statements are grouped by :py:meth:`transaction`, which joins the
+    hub's transaction when bound.
+
     **Context detection**
 
     The context is inferred from the database name prefix, e.g. ``cnf_sc2021`` ->
     context ``cnf``.  There is no context metadata stored inside the file itself.
     """
 
+    # number of (hash, feature, value) triples per executemany batch in set_values_bulk
+    BULK_CHUNK = 50000
+
+    # retries of locked write transactions (see retry_locked)
+    retries = 8
+    retry_delay = 0.01
+
     def __init__(self, dbcon, dbname, path, features, context, csv=False):
         """
         Args:
@@ -103,6 +256,12 @@ class Schema:
         self.context = context
         self.dbcon = dbcon
         self.csv = csv
+        # connection and transaction scope used for writes (see bind):
+        self.con = dbcon
+        self.sname = "main"
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.bound_transaction = None
 
     @classmethod
     def is_database(cls, path):
@@ -154,17 +313,30 @@ class Schema:
     def from_database(cls, path):
         """Load a Schema from an existing SQLite ``.db`` file."""
         dbname = cls.dbname_from_path(path)
-        con = sqlite3.connect(path)
+        con = sqlite3.connect(path, check_same_thread=False)
         features = cls.features_from_database(dbname, path, con)
         context = cls.context_from_database(dbname)
         return cls(con, dbname, path, features, context)
 
     @classmethod
     def from_csv(cls, path):
-        """Load a CSV file into a shared in-memory SQLite database and return a Schema."""
+        """Load a CSV file into a shared in-memory SQLite database and return a Schema.
+
+        The converted file is cached on disk (see :py:class:`CsvCache`), so later runs
+        copy the indexed SQLite file into memory instead of parsing the CSV again.
+        CSV files sharing a database name are merged into one in-memory database and
+        are always parsed.
+        """
         dbname = cls.dbname_from_path(path)
-        con = sqlite3.connect(f"file:{dbname}?mode=memory&cache=shared", uri=True)
-        features = cls.features_from_csv(dbname, path, con)
+        con = sqlite3.connect(f"file:{dbname}?mode=memory&cache=shared", uri=True, check_same_thread=False)
+        cache = CsvCache.from_environment()
+        merge = con.execute("SELECT 1 FROM sqlite_master WHERE name = 'features'").fetchone() is not None
+        if cache is not None and not merge and cache.load(path, con):
+            features = cls.features_from_csv_table(dbname, con)
+        else:
+            features = cls.features_from_csv(dbname, path, con)
+            if cache is not None and not merge:
+                cache.store(path, con)
         context = cls.context_from_csv(dbname)
         return cls(con, dbname, path, features, context, True)
 
@@ -176,6 +348,13 @@ class Schema:
         The CSV must contain a ``hash`` column; all columns become 1:1 features stored
         in a single ``features`` table.  Column names are sanitised to valid identifiers.
 
+        The file is parsed by Polars and inserted with one parameterised
+        ``executemany``.  Column types are inferred from all values: integer and
+        float columns get ``INTEGER`` and ``REAL`` affinity (so numeric comparisons and
+        sorting need no casts), all other columns (and ``hash``) are ``TEXT``.  Missing
+        values are stored as empty strings in all columns, as before.  An index on
+        ``hash`` makes joins with other databases as fast as with database files.
+
         Args:
             dbname (str): Logical database name.
             path (str): Path to the CSV file.
@@ -187,24 +366,50 @@ class Schema:
         Raises:
             SchemaException: If the CSV lacks a ``hash`` column.
         """
-        features = dict()
         with open(path) as csvfile:
             temp_lines = csvfile.readline() + "\n" + csvfile.readline()
-            dialect = csv.Sniffer().sniff(temp_lines, delimiters=";, \t")
-            csvfile.seek(0)
-            csvreader = csv.DictReader(csvfile, dialect=dialect)
-            if "hash" in csvreader.fieldnames:
-                cols = [re.sub("[^0-9a-zA-Z]+", "_", n) for n in csvreader.fieldnames]
-                for colname in cols:
-                    features[colname] = FeatureInfo(colname, dbname, "features", colname, None)
-                con.execute(f"CREATE TABLE IF NOT EXISTS features ({', '.join(cols)})")
-                for row in csvreader:
-                    vals = "', '".join(row.values())
-                    con.execute(f"INSERT INTO features VALUES ('{vals}')")
-                con.commit()
-            else:
-                raise SchemaException(f"Column 'hash' not found in {csvfile}")
-        return features
+        dialect = csv.Sniffer().sniff(temp_lines, delimiters=";, \t")
+        df = pl.read_csv(path, separator=dialect.delimiter, quote_char=dialect.quotechar, infer_schema=False)
+        if "hash" not in df.columns:
+            raise SchemaException(f"Column 'hash' not found in {path}")
+        cols = [re.sub("[^0-9a-zA-Z]+", "_", n) for n in df.columns]
+        columns, types = zip(*[(df[n].fill_null(""), "TEXT") if n == "hash" else cls.csv_column(df[n]) for n in df.columns])
+        con.execute(f"CREATE TABLE IF NOT EXISTS features ({', '.join(f'{c} {t}' for c, t in zip(cols, types))})")
+        con.executemany(f"INSERT INTO features VALUES ({', '.join('?' * len(cols))})", pl.DataFrame(columns).iter_rows())
+        con.execute("CREATE INDEX IF NOT EXISTS features_hash ON features (hash)")
+        con.commit()
+        return cls.features_from_csv_table(dbname, con)
+
+    @classmethod
+    def features_from_csv_table(cls, dbname, con) -> typing.Dict[str, FeatureInfo]:
+        """Build the feature metadata of a converted CSV from its ``features`` table."""
+        columns = con.execute("PRAGMA table_info(features)").fetchall()
+        return {colname: FeatureInfo(colname, dbname, "features", colname, None, coltype) for _, colname, coltype, *_ in columns}
+
+    @staticmethod
+    def csv_column(column: pl.Series):
+        """Return the values to insert and the SQLite type of the CSV string *column*.
+
+        The type is ``INTEGER`` or ``REAL`` if every value of the column parses as such
+        and prints back to the same text, else ``TEXT``, so values like ``007``, ``1.50``
+        or ``inf`` keep their spelling.  Missing values become empty strings; the column
+        affinity still stores the other values of a numeric column with missing values
+        as numbers.
+        """
+        missing = column.null_count()
+        if missing < len(column):
+            for dtype, sqltype in ((pl.Int64, "INTEGER"), (pl.Float64, "REAL")):
+                parsed = column.cast(dtype, strict=False)
+                if parsed.null_count() == missing and Schema.csv_lossless(column, parsed):
+                    return (parsed if not missing else column.fill_null("")), sqltype
+        return column.fill_null(""), "TEXT"
+
+    @staticmethod
+    def csv_lossless(column: pl.Series, parsed: pl.Series):
+        """Return ``True`` if the finite numbers *parsed* from *column* print back to its text."""
+        if parsed.dtype == pl.Float64 and not parsed.is_finite().all():
+            return False
+        return (parsed.cast(pl.Utf8) == column).all()
 
     # Create schema info for sqlite database
     @classmethod
@@ -235,7 +440,7 @@ class Schema:
                 if not is_fk_column and not is_fk_hash:
                     fname = colname if table == "features" else table
                     dval = default_value.strip('"') if default_value else None
-                    features[fname] = FeatureInfo(fname, dbname, table, colname, dval)
+                    features[fname] = FeatureInfo(fname, dbname, table, colname, dval, coltype)
         return features
 
     @classmethod
@@ -447,18 +652,91 @@ class Schema:
     def is_in_memory(self):
         return self.csv
 
-    def get_connection(self):
+    def bind(self, con, transaction):
+        """Route all further statements through the hub connection of a :py:class:`Database`.
+
+        Args:
+            con: Hub ``sqlite3`` connection with this schema attached as :py:attr:`dbname`.
+            transaction: Context manager factory of the hub's transaction scope, e.g.
+                :py:meth:`Database.transaction`.
+        """
+        self.con = con
+        self.sname = self.dbname
+        self.bound_transaction = transaction
+
+    @contextmanager
+    def transaction(self):
+        """Group the enclosed statements into one transaction.
+
+        When bound, joins :py:meth:`Database.transaction`, which write-locks only this
+        schema's database.  Otherwise nested blocks join the outermost one, which takes
+        the write lock upfront (:py:meth:`begin`) and commits on exit or rolls back on an
+        exception.
+        """
+        if self.bound_transaction is not None:
+            with self.bound_transaction(self.dbname):
+                yield
+            return
+        with self.lock:
+            if not self.depth:
+                try:
+                    self.begin()
+                except sqlite3.OperationalError:
+                    self.con.rollback()
+                    raise
+            self.depth += 1
+            try:
+                yield
+            except BaseException:
+                self.depth -= 1
+                if not self.depth:
+                    self.con.rollback()
+                raise
+            self.depth -= 1
+            if not self.depth:
+                try:
+                    self.commit()
+                except sqlite3.OperationalError:
+                    self.con.rollback()
+                    raise
+
+    @retry_locked
+    def begin(self):
+        """Start a transaction and take the write lock (:py:meth:`reserve`), waiting for other writers."""
+        started = not self.con.in_transaction
+        if started:
+            self.con.execute("BEGIN")
+        try:
+            self.reserve()
+        except sqlite3.OperationalError:
+            if started:
+                # release the read lock before retrying, or a writer waiting for it cannot commit
+                self.con.rollback()
+            raise
+
+    def reserve(self):
+        """Take the write lock of this schema's database file within the open transaction.
+
+        Runs a write that changes nothing, so that only this file is locked, not the
+        other databases attached to the same connection (as ``BEGIN IMMEDIATE`` would).
+        In-memory (CSV) schemas need no lock.
+        """
         if self.is_in_memory():
-            return sqlite3.connect("file::memory:?cache=shared", uri=True)
+            return
+        if "features" in self.get_tables():
+            self.con.execute(f"UPDATE {self.sname}.features SET hash = hash WHERE 0")
         else:
-            return sqlite3.connect(self.path)
+            version = self.con.execute(f"PRAGMA {self.sname}.user_version").fetchone()[0]
+            self.con.execute(f"PRAGMA {self.sname}.user_version = {version}")
 
-    def execute(self, sql):
-        con = self.get_connection()
-        cur = con.cursor()
-        cur.execute(sql)
-        con.commit()
-        con.close()
+    @retry_locked
+    def commit(self):
+        self.con.commit()
+
+    def execute(self, sql, params=()):
+        """Execute one statement within :py:meth:`transaction` and return its row count."""
+        with self.transaction():
+            return self.con.execute(sql, params).rowcount
 
     def get_tables(self):
         return list(set([f.table for f in self.get_features()]))
@@ -488,12 +766,12 @@ class Schema:
         """
         main_table = "features"
         if not main_table in self.get_tables():
-            self.execute(f"CREATE TABLE IF NOT EXISTS {main_table} (hash UNIQUE NOT NULL)")
+            self.execute(f"CREATE TABLE IF NOT EXISTS {self.sname}.{main_table} (hash UNIQUE NOT NULL)")
             # insert all known hashes into main table and create triggers
             for table in [t for t in self.get_tables() if t != main_table]:
-                self.execute(f"INSERT OR IGNORE INTO {main_table} (hash) SELECT DISTINCT(hash) FROM {table}")
+                self.execute(f"INSERT OR IGNORE INTO {self.sname}.{main_table} (hash) SELECT DISTINCT(hash) FROM {self.sname}.{table}")
                 self.execute(
-                    f"""CREATE TRIGGER IF NOT EXISTS {table}_dval AFTER INSERT ON {table} 
+                    f"""CREATE TRIGGER IF NOT EXISTS {self.sname}.{table}_dval AFTER INSERT ON {table}
                                             BEGIN INSERT OR IGNORE INTO {main_table} (hash) VALUES (NEW.hash); END"""
                 )
             self.features["hash"] = FeatureInfo("hash", self.dbname, main_table, "hash", None)
@@ -514,6 +792,8 @@ class Schema:
             (see ``Issues.md`` #7), and installs a trigger to keep
             ``features.{name}`` (the FK mirror column) in sync.
 
+        All statements run in one :py:meth:`transaction`.
+
         Args:
             name (str): Feature name; validated against reserved words and SQLite
                 keywords unless *permissive* is ``True``.
@@ -533,98 +813,127 @@ class Schema:
 
         created = []
 
-        if not self.has_feature(name):
+        if self.has_feature(name):
+            if not permissive:
+                raise SchemaException(f"Feature '{name}' already exists")
+            return created
+
+        with self.transaction():
             # ensure existence of main table:
             created.extend(self.create_main_table_if_not_exists())
 
             # create new feature:
             main_table = "features"
-            self.execute(f"ALTER TABLE {main_table} ADD {name} TEXT NOT NULL DEFAULT {default_value or 'None'}")
+            self.execute(f"ALTER TABLE {self.sname}.{main_table} ADD {name} TEXT NOT NULL DEFAULT {default_value or 'None'}")
             if default_value is not None:
                 # feature is unique and resides in main features-table:
-                self.features[name] = FeatureInfo(name, self.dbname, main_table, name, default_value)
+                self.features[name] = FeatureInfo(name, self.dbname, main_table, name, default_value, "TEXT")
             else:
                 # feature is not unique and resides in a separate table (column in main features-table is a foreign key):
-                self.execute(f"CREATE TABLE IF NOT EXISTS {name} (hash TEXT NOT NULL, value TEXT NOT NULL, CONSTRAINT all_unique UNIQUE(hash, value))")
-                self.execute(f"INSERT INTO {name} (hash, value) VALUES ('None', 'None')")
                 self.execute(
-                    f"""CREATE TRIGGER IF NOT EXISTS {name}_hash AFTER INSERT ON {name}
+                    f"CREATE TABLE IF NOT EXISTS {self.sname}.{name} (hash TEXT NOT NULL, value TEXT NOT NULL, CONSTRAINT all_unique UNIQUE(hash, value))"
+                )
+                self.execute(f"INSERT INTO {self.sname}.{name} (hash, value) VALUES ('None', 'None')")
+                self.execute(
+                    f"""CREATE TRIGGER IF NOT EXISTS {self.sname}.{name}_hash AFTER INSERT ON {name}
                                     BEGIN INSERT OR IGNORE INTO {main_table} (hash) VALUES (NEW.hash); END"""
                 )
-                self.features[name] = FeatureInfo(name, self.dbname, name, "value", None)
+                self.features[name] = FeatureInfo(name, self.dbname, name, "value", None, "TEXT")
 
             # update schema:
             created.append(self.features[name])
 
-        elif not permissive:
-            raise SchemaException(f"Feature '{name}' already exists")
-
         return created
 
-    def set_values(self, feature, value, hashes):
-        """Persist *value* for *feature* on each hash in *hashes*.
+    def set_values(self, mappings, hashes):
+        """Persist multiple feature values on the given hashes.
 
-        * **1:n feature**: inserts ``(hash, value)`` rows; duplicate pairs are silently
-          ignored (``INSERT OR IGNORE``); also updates ``features.{name} = hash`` to
-          keep the FK mirror column current.
-        * **1:1 feature**: upserts into the ``features`` column; on hash conflict,
-          updates the column to *value*.
+        ``mappings`` is a ``{feature_name: value}`` dict.  The cross product of
+        *mappings* and *hashes* is written with :py:meth:`set_values_bulk`.
+
+        The batched multi-value interface was contributed by Christoph Jabs (chrjabs,
+        PR #39): collapsing per-feature writes took a wcnfbase extraction run from
+        ~20 minutes down to ~40 seconds.
 
         Args:
-            feature (str): Feature name.
-            value: Value to store (coerced to ``TEXT`` by SQLite).
+            mappings (dict): Mapping of feature name to value.
             hashes (list[str]): Benchmark hashes to update.
 
         Raises:
-            SchemaException: If the feature does not exist or *hashes* is empty.
+            SchemaException: If a feature does not exist or *hashes* is empty.
         """
-    def set_values(self, mappings, hashes):
-        """Persist multiple feature values on the given hashes.
+        if not len(hashes):
+            raise SchemaException("No hashes given")
+        for feature in mappings.keys():
+            if not self.has_feature(feature):
+                raise SchemaException(f"Feature '{feature}' does not exist")
+        self.set_values_bulk((h, feature, value) for feature, value in mappings.items() for h in hashes)
 
-        ``mappings`` is a ``{feature_name: value}`` dict.
+    def set_values_bulk(self, rows):
+        """Persist many ``(hash, feature, value)`` triples in a single transaction.
 
-        * **1:n features** are written individually: ``(hash, value)`` rows are inserted
-          into the feature's own table (duplicate pairs ignored) and ``features.{name} =
-          hash`` is updated to keep the mirror column current.
-        * **1:1 features** are all written to the ``features`` table in a single
-          ``INSERT ... ON CONFLICT`` statement, which is far faster than one query per
-          feature when an extractor produces many features per instance.
+        *rows* may be any iterable (e.g. a generator); it is consumed in chunks of
+        :py:attr:`BULK_CHUNK` triples, each written by :py:meth:`write_rows`.  Nothing
+        is committed if a chunk fails.
+
+        Args:
+            rows (Iterable[tuple]): ``(hash, feature, value)`` triples.
+
+        Raises:
+            SchemaException: If a feature does not exist.
+        """
+        with self.transaction():
+            for chunk in slice_iterator(rows, self.BULK_CHUNK):
+                self.write_rows(chunk)
 
-        The batched multi-value writer was contributed by Christoph Jabs (chrjabs,
-        PR #39): collapsing per-feature writes into one query took a wcnfbase extraction
-        run from ~20 minutes down to ~40 seconds.
+    def write_rows(self, rows):
+        """Write ``(hash, feature, value)`` triples in the current :py:meth:`transaction`.
+
+        Values are bound as statement parameters and written with ``executemany``;
+        each statement binds one row, so the number of SQL variables stays far below
+        SQLite's limit regardless of the batch size.
+
+        * **1:n features**: ``INSERT OR IGNORE`` of ``(hash, value)`` pairs per feature,
+          followed by an indexed update of the mirror column ``features.{name} = hash``
+          for each distinct hash.
+        * **1:1 features**: all columns of a hash are upserted in one multi-column
+          ``INSERT ... ON CONFLICT (hash) DO UPDATE``; hashes with the same set of
+          columns share one ``executemany``.  If a hash is given several values for a
+          column, the last one wins.
+
+        Values are stored as text, as before.
 
         Args:
-            mappings (dict): Mapping of feature name to value.
-            hashes (list[str]): Benchmark hashes to update.
+            rows (list[tuple]): ``(hash, feature, value)`` triples.
 
         Raises:
-            SchemaException: If a feature does not exist or *hashes* is empty.
+            SchemaException: If a feature does not exist.
         """
-        if not len(hashes):
-            raise SchemaException("No hashes given")
-        hash_list = ", ".join(f"'{h}'" for h in hashes)
-        unique = {}  # column -> value, batched into a single query on the 'features' table
-        for feature, value in mappings.items():
+        per_feature = dict()  # 1:n feature -> (hash, value) pairs
+        per_hash = dict()  # hash -> {1:1 column: value}
+        for hashv, feature, value in rows:
             if not self.has_feature(feature):
                 raise SchemaException(f"Feature '{feature}' does not exist")
-            table = self.features[feature].table
-            column = self.features[feature].column
-            if self.features[feature].default is None:
-                # 1:n feature: dedicated table plus a mirror column in the 'features' table
-                values = ", ".join(f"('{h}', '{value}')" for h in hashes)
-                self.execute(f"INSERT OR IGNORE INTO {table} (hash, {column}) VALUES {values}")
-                self.execute(f"UPDATE features SET {table}=hash WHERE hash in ({hash_list})")
+            info = self.features[feature]
+            if info.default is None:
+                per_feature.setdefault(feature, []).append((hashv, str(value)))
             else:
-                # 1:1 feature: a column in the 'features' table (batched below)
-                assert table == "features"
-                unique[column] = value
-        if not unique:
-            return
-        columns = ", ".join(unique)
-        cells = ", ".join(f"'{v}'" for v in unique.values())
-        row_values = ", ".join(f"('{h}', {cells})" for h in hashes)
-        updates = ", ".join(f"{col}='{v}'" for col, v in unique.items())
-        self.execute(
-            f"INSERT INTO features (hash, {columns}) VALUES {row_values} ON CONFLICT (hash) DO UPDATE SET {updates} WHERE hash in ({hash_list})"
-        )
+                assert info.table == "features"
+                per_hash.setdefault(hashv, {})[info.column] = str(value)
+        for feature, pairs in per_feature.items():
+            info = self.features[feature]
+            # 1:n feature: dedicated table plus a mirror column in the 'features' table
+            self.con.executemany(f"INSERT OR IGNORE INTO {self.sname}.{info.table} (hash, {info.column}) VALUES (?, ?)", pairs)
+            mirrored = [(h,) for h in dict.fromkeys(h for h, _ in pairs)]
+            self.con.executemany(f"UPDATE {self.sname}.features SET {info.table} = hash WHERE hash = ? AND {info.table} != hash", mirrored)
+        per_columns = dict()  # 1:1 columns -> rows of hash and values
+        for hashv, values in per_hash.items():
+            columns = tuple(sorted(values))
+            per_columns.setdefault(columns, []).append((hashv, *(values[c] for c in columns)))
+        for columns, params in per_columns.items():
+            # 1:1 features: columns in the 'features' table, one upsert per hash
+            self.con.executemany(
+                f"INSERT INTO {self.sname}.features (hash, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+                f"ON CONFLICT (hash) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}",
+                params,
+            )
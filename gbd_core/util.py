@@ -12,6 +12,7 @@
 # The above copyright notice and this permission notice shall be included in all
 # copies or substantial portions of the Software.
 
+import json
 import sys
 import os
 
@@ -110,6 +111,15 @@ def is_number(s):
     return False
 
 
+def render_value(value):
+    """Render a query result value for text output; lists (collapse=list) as compact JSON arrays."""
+    if value is None:
+        return "[None]"
+    if isinstance(value, (list, tuple)):
+        return json.dumps([str(v) for v in value], separators=(",", ":"))
+    return str(value)
+
+
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
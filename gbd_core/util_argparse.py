@@ -16,7 +16,7 @@ import argparse
 import os
 import re
 
-from gbd_core import util
+from gbd_core import functions, util
 
 
 def get_gbd_argparser():
@@ -79,3 +79,31 @@ def key_value_type(s):
     if len(tup) != 2:
         raise argparse.ArgumentTypeError(f"key-value type: {s} must be separated by exactly one = ")
     return (column_type(tup[0]), tup[1])
+
+
+def feature_map_type(s):
+    tup = s.split("=", 1)
+    if len(tup) != 2 or not len(tup[0]):
+        raise argparse.ArgumentTypeError(f"feature map: {s} must be of the form column=feature")
+    return (tup[0], column_type(tup[1]))
+
+
+COLLAPSE_FUNCTIONS = ["group_concat", "min", "max", "avg", "count", "sum", "list", "median", "mode", "stddev", "none"]
+
+
+def collapse_type(s):
+    try:
+        if s.lower() in COLLAPSE_FUNCTIONS or functions.statistic_sql(s, "value") is not None:
+            return s.lower()
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f"Collapse function {s}: {err}")
+    raise argparse.ArgumentTypeError(f"Collapse function {s} is not one of {', '.join(COLLAPSE_FUNCTIONS)}, quantile(p), or pNN")
+
+
+def sort_type(s):
+    feature, direction = s, "asc"
+    if ":" in s and s.rsplit(":", 1)[1].lower() in ["asc", "desc"]:
+        feature, direction = s.rsplit(":", 1)
+    for part in feature.split(":"):
+        column_type(part)
+    return (feature, direction.lower() == "desc")
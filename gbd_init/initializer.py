@@ -13,7 +13,11 @@
 # copies or substantial portions of the Software.
 
 import multiprocessing
+import queue
+import threading
+import time
 from concurrent.futures import as_completed
+from contextlib import contextmanager
 
 import pebble
 import polars as pl
@@ -27,6 +31,12 @@ class InitializerException(Exception):
 
 
 class Initializer:
+    # results wait in a bounded queue for the writer thread (backpressure on producers)
+    QUEUE_SIZE = 1024
+    # the writer commits after this many rows or seconds, whichever comes first
+    BATCH_ROWS = 10000
+    BATCH_SECONDS = 1.0
+
     def __init__(self, api: GBD, rlimits: dict, target_db: str, features: list, initfunc):
         self.api = api
         self.api.database.set_auto_commit(False)
@@ -34,28 +44,89 @@ class Initializer:
         self.features = features
         self.initfunc = initfunc
         self.rlimits = rlimits
+        self.queue = None  # feeds the writer thread while run() is active
+        self.error = None  # first exception raised by the writer thread
 
     def create_features(self):
-        for name, default in self.features:
-            self.api.database.create_feature(name, default, self.target_db, True)
-        self.api.database.commit()
+        with self.api.database.transaction():
+            for name, default in self.features:
+                self.api.database.create_feature(name, default, self.target_db, True)
 
     def save_features(self, result: list):
-        # Group each hash's (feature, value) pairs so that a hash's unique features are
-        # written in a single query. Robust to empty results (e.g. failed or timed-out
-        # extractions, which yield []) and to results spanning multiple hashes.
-        by_hash = {}
-        for name, hashv, value in result:
-            by_hash.setdefault(hashv, {})[name] = value
-        for hashv, mappings in by_hash.items():
-            self.api.database.set_values(mappings, [hashv], self.target_db)
-        self.api.database.commit()
+        # Results are (feature, hash, value) triples. Robust to empty results (e.g. failed
+        # or timed-out extractions, which yield []) and to results spanning multiple hashes.
+        # While run() is active, they are handed to the writer thread.
+        if self.queue is None:
+            self.write_rows(result)
+            return
+        if self.error is not None:
+            raise InitializerException(f"Writer failed: {self.error}")
+        self.queue.put(result)
+
+    def write_rows(self, result: list):
+        # one transaction of parameterised multi-row statements (see Database.set_values_bulk)
+        self.api.database.set_values_bulk(((hashv, name, value) for name, hashv, value in result), self.target_db)
+
+    @contextmanager
+    def writer(self):
+        """Write results in a background thread while the enclosed block computes them
+
+        The thread coalesces queued results and commits them in batches of up to
+        BATCH_ROWS rows or after BATCH_SECONDS. Each batch is committed atomically,
+        so an interrupted run keeps all completed batches and no partial ones.
+        On exit, the remaining results are flushed, also after an exception.
+
+        Raises:
+        InitializerException, if writing a batch failed
+        """
+        self.queue = queue.Queue(self.QUEUE_SIZE)
+        self.error = None
+        thread = threading.Thread(target=self.write_loop, name="gbd-writer", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            self.queue.put(None)
+            thread.join()
+            self.queue = None
+        if self.error is not None:
+            raise InitializerException(f"Writer failed: {self.error}") from self.error
+
+    def write_loop(self):
+        rows = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                result = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                result = []
+            if result:
+                if deadline is None:
+                    deadline = time.monotonic() + self.BATCH_SECONDS
+                rows.extend(result)
+            if rows and (result is None or len(rows) >= self.BATCH_ROWS or time.monotonic() >= deadline):
+                self.flush(rows)
+                rows = []
+                deadline = None
+            if result is None:
+                return
+
+    def flush(self, rows: list):
+        if self.error is not None:
+            return  # keep draining the queue so that producers do not block
+        try:
+            self.write_rows(rows)
+        except Exception as e:
+            self.error = e
+            util.eprint(f"{e.__class__.__name__}: {e}")
 
     def run(self, instances: pl.DataFrame):
-        if self.rlimits["jobs"] == 1:
-            self.init_sequential(instances)
-        else:
-            self.init_parallel_pp(instances)
+        with self.writer():
+            if self.rlimits["jobs"] == 1:
+                self.init_sequential(instances)
+            else:
+                self.init_parallel_pp(instances)
 
     def init_sequential(self, instances: pl.DataFrame):
         for row in instances.iter_rows(named=True):
@@ -72,6 +143,8 @@ class Initializer:
                 except pebble.ProcessExpired as e:
                     f.cancel()
                     util.eprint(f"{e.__class__.__name__}: {e}")
+                except InitializerException:
+                    raise
                 except GBDException as e:  # might receive special handling in the future
                     util.eprint(f"{e.__class__.__name__}: {e}")
                 except Exception as e:
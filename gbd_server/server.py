@@ -17,6 +17,7 @@
 import logging
 import os
 import re
+from contextlib import ExitStack
 from logging.handlers import TimedRotatingFileHandler
 
 import flask
@@ -31,6 +32,12 @@ from gbd_core.grammar import ParserException
 
 app = flask.Flask(__name__)
 
+# Number of request threads, each context's GBD instance pools as many read connections
+THREADS = 4
+
+# Number of results per page, pages are fetched with LIMIT/OFFSET
+PAGE_SIZE = 1000
+
 # Display a value as a formatted number only if it is a plain decimal; scientific
 # notation would mangle hex-hash features like isohash2 (e.g. 9026252821384e97).
 DISPLAY_NUMBER = re.compile(r"^[+-]?\d+(\.\d+)?$")
@@ -41,7 +48,7 @@ def request_query(request):
     if "query" in request.values:
         query = request.values.get("query")
     elif len(request.args) > 0:
-        query = " and ".join([f"{key}={value}" for (key, value) in request.args.items() if key != "context"])
+        query = " and ".join([f"{key}={value}" for (key, value) in request.args.items() if key not in ["context", "page", "sort"]])
     return query
 
 
@@ -64,6 +71,14 @@ def request_page(request):
         return 0
 
 
+def request_sort(request, database):
+    # sort=feature[:asc|desc], restricted to the features shown for the database
+    feature, _, direction = request.values.get("sort", "").partition(":")
+    if feature in app.config["features"][database] and direction in ["", "asc", "desc"]:
+        return feature + (":" + direction if direction else ""), [(f"{database}:{feature}", direction == "desc")]
+    return "", []
+
+
 def request_action(request):
     return request.values.get("action") if "action" in request.values else "default"
 
@@ -74,6 +89,11 @@ def request_context(request):
     return context if context in app.config.get("contexts", []) else contexts.default_context()
 
 
+def min_value(value):
+    # smallest of the values of a 1:n feature, or the value of a 1:1 feature
+    return min(value, default=None) if isinstance(value, list) else value
+
+
 def query_to_name(query):
     return re.sub(r"[^\w]", "_", query) if query else "allinstances"
 
@@ -98,43 +118,46 @@ def json_response(json_blob, msg, addr):
     return flask.Response(json_blob, status=200, mimetype="application/json")
 
 
-def page_response(context, query, database, page=0):
-    with GBD(app.config["contextdbs"][context]) as gbd:
-        start = page * 1000
-        end = start + 1000
-        error = None
-        try:
-            df: pl.DataFrame = gbd.query(query, resolve=[f"{database}:{f}" for f in app.config["features"][database]], collapse="GROUP_CONCAT")
-        except GBDException as err:
-            error = f"GBDException: {err}"
-        except DatabaseException as err:
-            error = f"DatabaseException: {err}"
-        except ParserException as err:
-            error = f"ParserException: {err}"
-        except Exception:
-            app.logger.exception(f"Unhandled exception while querying '{query}'")
-            error = "An Unhandled Exception Occurred"
-        return flask.render_template(
-            "index.html",
-            context=context,
-            error=error,
-            contexts=app.config["contexts"],
-            query=query,
-            query_name=query_to_name(query),
-            # result=df.iloc[start:end, :].values.tolist() if error is None else [],
-            result=(
-                [list(r) for r in df.slice(start, end - start).rows()]
-                if error is None
-                else []
-            ),
-            total=len(df) if error is None else 0,
-            page=page,
-            pages=(len(df) + 999) // 1000 if error is None else 0,
-            selected=database,
-            features=app.config["features"][database],
-            databases=[gbd.get_database_name(db) for db in app.config["contextdbs"][context]],
-            action=request_action(flask.request),
+def page_response(context, query, database, page=0, sort="", sort_by=[]):
+    gbd: GBD = app.config["gbds"][context]
+    error = None
+    total = 0
+    try:
+        total = gbd.count(query)
+        df: pl.DataFrame = gbd.query(
+            query,
+            resolve=[f"{database}:{f}" for f in app.config["features"][database]],
+            collapse="GROUP_CONCAT",
+            sort_by=sort_by,
+            limit=PAGE_SIZE,
+            offset=page * PAGE_SIZE,
         )
+    except GBDException as err:
+        error = f"GBDException: {err}"
+    except DatabaseException as err:
+        error = f"DatabaseException: {err}"
+    except ParserException as err:
+        error = f"ParserException: {err}"
+    except Exception:
+        app.logger.exception(f"Unhandled exception while querying '{query}'")
+        error = "An Unhandled Exception Occurred"
+    return flask.render_template(
+        "index.html",
+        context=context,
+        error=error,
+        contexts=app.config["contexts"],
+        query=query,
+        query_name=query_to_name(query),
+        result=[list(r) for r in df.rows()] if error is None else [],
+        total=total if error is None else 0,
+        page=page,
+        pages=(total + PAGE_SIZE - 1) // PAGE_SIZE if error is None else 0,
+        sort=sort,
+        selected=database,
+        features=app.config["features"][database],
+        databases=[gbd.get_database_name(db) for db in app.config["contextdbs"][context]],
+        action=request_action(flask.request),
+    )
 
 
 # Returns main index page
@@ -147,7 +170,8 @@ def quick_search():
     if database not in context_databases:
         database = context_databases[0]
     page = request_page(flask.request)
-    return page_response(context, query, database, page)
+    sort, sort_by = request_sort(flask.request, database)
+    return page_response(context, query, database, page, sort, sort_by)
 
 
 # Generates a list of URLs. Given query (text field of POST form) is executed and the hashes of the result are resolved
@@ -156,17 +180,17 @@ def quick_search():
 @app.route("/getinstances", methods=["POST", "GET"])
 def get_url_file():
     context = request_context(flask.request)
-    with GBD(app.config["contextdbs"][context]) as gbd:
-        query = request_query(flask.request)
-        try:
-            df: pl.DataFrame = gbd.query(query)
-        except (GBDException, DatabaseException, ParserException) as err:
-            return error_response(f"{type(err)}, {err}", flask.request.remote_addr, errno=500)
-        if context == "cnf":
-            content = "\n".join([flask.url_for("get_file", hashvalue=val, _external=True) for val in df["hash"].to_list()])
-        else:
-            content = "\n".join([flask.url_for("get_file", hashvalue=val, context=context, _external=True) for val in df["hash"].to_list()])
-        return file_response(content, query_to_name(query) + ".uri", "text/uri-list", flask.request.remote_addr)
+    gbd: GBD = app.config["gbds"][context]
+    query = request_query(flask.request)
+    try:
+        df: pl.DataFrame = gbd.query(query)
+    except (GBDException, DatabaseException, ParserException) as err:
+        return error_response(f"{type(err)}, {err}", flask.request.remote_addr, errno=500)
+    if context == "cnf":
+        content = "\n".join([flask.url_for("get_file", hashvalue=val, _external=True) for val in df["hash"].to_list()])
+    else:
+        content = "\n".join([flask.url_for("get_file", hashvalue=val, context=context, _external=True) for val in df["hash"].to_list()])
+    return file_response(content, query_to_name(query) + ".uri", "text/uri-list", flask.request.remote_addr)
 
 
 # Send database file
@@ -185,19 +209,19 @@ def get_database_file(database=None):
 @app.route("/file/<hashvalue>")
 def get_file(hashvalue):
     context = request_context(flask.request)
-    with GBD(app.config["contextdbs"][context]) as gbd:
-        try:
-            df: pl.DataFrame = gbd.query(hashes=[hashvalue], resolve=["local", "filename"], collapse="MIN")
-        except (GBDException, DatabaseException, ParserException) as err:
-            return error_response(f"{type(err)}, {err}", flask.request.remote_addr, errno=500)
-        if not len(df):
-            return error_response(f"Hash '{hashvalue}' not found", flask.request.remote_addr)
-        row = df.to_dicts()[0]
-        if not os.path.exists(row["local"]):
-            return error_response("Files temporarily not accessible", flask.request.remote_addr)
-        # Restrict to the POSIX portable filename character set so the name is shell-safe.
-        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", row["filename"])
-        return path_response(row["local"], row["hash"] + "-" + safe_name, "application/x-xz", flask.request.remote_addr)
+    gbd: GBD = app.config["gbds"][context]
+    try:
+        row = gbd.lookup([hashvalue], ["local", "filename"], frame=False)
+    except (GBDException, DatabaseException, ParserException) as err:
+        return error_response(f"{type(err)}, {err}", flask.request.remote_addr, errno=500)
+    local, filename = [min_value(row[feature][0]) for feature in ["local", "filename"]]
+    if local is None:
+        return error_response(f"Hash '{hashvalue}' not found", flask.request.remote_addr)
+    if not os.path.exists(local):
+        return error_response("Files temporarily not accessible", flask.request.remote_addr)
+    # Restrict to the POSIX portable filename character set so the name is shell-safe.
+    safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", filename or "")
+    return path_response(local, hashvalue + "-" + safe_name, "application/x-xz", flask.request.remote_addr)
 
 
 # start the server
@@ -237,6 +261,10 @@ def serve(gbd: GBD, port: int = 5000, logdir: str = "/tmp"):
     app.config["contextdbs"] = {}
     for ctxt in app.config["contexts"]:
         app.config["contextdbs"][ctxt] = [gbd.get_database_path(c) for c in gbd.get_databases(ctxt)]
+    # one pooled GBD instance per context, shared by all request threads
+    app.config["gbds"] = {}
+    for ctxt, dbs in app.config["contextdbs"].items():
+        app.config["gbds"][ctxt] = GBD(dbs, pool_size=THREADS)
     # group features by database
     app.config["dbpaths"] = {}
     app.config["features"] = {}
@@ -245,4 +273,7 @@ def serve(gbd: GBD, port: int = 5000, logdir: str = "/tmp"):
         app.config["dbpaths"][db] = gbd.get_database_path(db)
     app.config["features_flat"] = [f for f in gbd.get_features() if not f in ["hash", "local"]]
 
-    waitress.serve(app, host="0.0.0.0", port=port)
+    with ExitStack() as stack:
+        for context_gbd in app.config["gbds"].values():
+            stack.enter_context(context_gbd)
+        waitress.serve(app, host="0.0.0.0", port=port, threads=THREADS)
@@ -1,3 +1,16 @@
+"""Concurrency benchmark for several gbd processes writing to the same database.
+
+Phase 1 (writers): N processes each run M write transactions (GBD.set_values) against
+one database file, for every combination of journal mode and retry setting.  Reports
+writes per second and the number of "database is locked" errors that reached the caller.
+
+Phase 2 (rename): create/rename features via the CLI, killing each process after a few
+milliseconds, and probe the database for leftover locks.
+
+Usage: python stress_rename_script.py [writers] [transactions per writer]
+"""
+
+import multiprocessing
 import sqlite3
 import subprocess
 import time
@@ -5,70 +18,126 @@ import os
 import sys
 import random
 
+from gbd_core.api import GBD, GBDException
+from gbd_core.database import DatabaseException
+
 DB_NAME = "stress_rename_lock_test.db"
 os.environ["GBD_DB"] = DB_NAME
 
-if os.path.exists(DB_NAME):
-    os.remove(DB_NAME)
-
-# Bootstrap
-subprocess.run([sys.executable, 'gbd.py', 'create', 'feat0', '-u', 'empty'], capture_output=True)
-
-iterations = 80
-locked_errors = 0
-busy_errors = 0
-other_errors = 0
-info_ok_count = 0
-created_features = ['feat0']
-
-for i in range(1, iterations + 1):
-    if i % 2 == 1:
-        feat = f"f{i}"
-        cmd = [sys.executable, 'gbd.py', 'create', feat, '-u', 'empty']
-        created_features.append(feat)
-    else:
-        if len(created_features) > 0:
-            src = created_features[-1]
-            dst = f"{src}_ren"
-            cmd = [sys.executable, 'gbd.py', 'rename', src, dst]
-        else:
-            cmd = [sys.executable, 'gbd.py', 'info']
 
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    time.sleep(random.uniform(0.005, 0.040))
-    p.terminate()
-    try:
-        p.wait(timeout=0.2)
-    except subprocess.TimeoutExpired:
-        p.kill()
-        p.wait()
+def remove_db():
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(DB_NAME + suffix):
+            os.remove(DB_NAME + suffix)
+
 
+def writer(wid, transactions, journal_mode, busy_timeout, retries, queue):
+    writes = locked = 0
     try:
-        conn = sqlite3.connect(DB_NAME, timeout=0.1)
-        conn.execute("CREATE TABLE IF NOT EXISTS _probe2(i INTEGER);")
-        conn.execute("INSERT INTO _probe2(i) VALUES (?);", (i,))
-        conn.commit()
-        conn.close()
-    except sqlite3.OperationalError as e:
-        msg = str(e).lower()
-        if 'locked' in msg:
-            locked_errors += 1
-        elif 'busy' in msg:
-            busy_errors += 1
+        with GBD([DB_NAME], journal_mode=journal_mode, busy_timeout=busy_timeout, retries=retries) as api:
+            for t in range(transactions):
+                hashes = [f"w{wid}t{t}h{h}" for h in range(10)]
+                try:
+                    api.set_values("stress", str(t), hashes)
+                    writes += 1
+                except (GBDException, DatabaseException, sqlite3.OperationalError) as e:
+                    if "locked" not in str(e):
+                        raise
+                    locked += 1
+    finally:
+        queue.put((writes, locked))  # the parent waits for one result per writer
+
+
+def bench_writers(n_writers, transactions, journal_mode, busy_timeout, retries):
+    remove_db()
+    sqlite3.connect(DB_NAME).close()
+    with GBD([DB_NAME], journal_mode=journal_mode) as api:
+        api.create_feature("stress", "empty")
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=writer, args=(w, transactions, journal_mode, busy_timeout, retries, queue)) for w in range(n_writers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    writes = sum(r[0] for r in results)
+    locked = sum(r[1] for r in results)
+    print(f"journal={journal_mode:6s} busy_timeout={busy_timeout:5.2f}s retries={retries}: {writes:5d} writes in {elapsed:6.2f}s = {writes / elapsed:8.1f} writes/s, locked errors={locked}")
+    remove_db()
+    return locked
+
+
+def stress_rename(iterations=80):
+    remove_db()
+    # Bootstrap
+    subprocess.run([sys.executable, 'gbd.py', 'create', 'feat0', '-u', 'empty'], capture_output=True)
+
+    locked_errors = 0
+    busy_errors = 0
+    other_errors = 0
+    info_ok_count = 0
+    created_features = ['feat0']
+
+    for i in range(1, iterations + 1):
+        if i % 2 == 1:
+            feat = f"f{i}"
+            cmd = [sys.executable, 'gbd.py', 'create', feat, '-u', 'empty']
+            created_features.append(feat)
         else:
+            if len(created_features) > 0:
+                src = created_features[-1]
+                dst = f"{src}_ren"
+                cmd = [sys.executable, 'gbd.py', 'rename', src, dst]
+            else:
+                cmd = [sys.executable, 'gbd.py', 'info']
+
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        time.sleep(random.uniform(0.005, 0.040))
+        p.terminate()
+        try:
+            p.wait(timeout=0.2)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
+
+        try:
+            conn = sqlite3.connect(DB_NAME, timeout=0.1)
+            conn.execute("CREATE TABLE IF NOT EXISTS _probe2(i INTEGER);")
+            conn.execute("INSERT INTO _probe2(i) VALUES (?);", (i,))
+            conn.commit()
+            conn.close()
+        except sqlite3.OperationalError as e:
+            msg = str(e).lower()
+            if 'locked' in msg:
+                locked_errors += 1
+            elif 'busy' in msg:
+                busy_errors += 1
+            else:
+                other_errors += 1
+        except Exception:
             other_errors += 1
-    except Exception:
-        other_errors += 1
 
-    if i % 10 == 0:
-        res = subprocess.run([sys.executable, 'gbd.py', 'info'], capture_output=True)
-        if res.returncode == 0:
-            info_ok_count += 1
+        if i % 10 == 0:
+            res = subprocess.run([sys.executable, 'gbd.py', 'info'], capture_output=True)
+            if res.returncode == 0:
+                info_ok_count += 1
 
-print(f"Summary: iterations={iterations}, locked={locked_errors}, busy={busy_errors}, other={other_errors}, info_ok_count={info_ok_count}")
+    print(f"Rename summary: iterations={iterations}, locked={locked_errors}, busy={busy_errors}, other={other_errors}, info_ok_count={info_ok_count}")
+    remove_db()
+    return locked_errors + busy_errors
 
-if os.path.exists(DB_NAME):
-    os.remove(DB_NAME)
 
-if locked_errors > 0 or busy_errors > 0:
-    sys.exit(1)
+if __name__ == "__main__":
+    n_writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    transactions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{n_writers} writers x {transactions} transactions")
+    # a short busy timeout without retries shows the lock errors that retries absorb
+    for journal_mode in ("delete", "wal"):
+        bench_writers(n_writers, transactions, journal_mode, 0.05, 0)
+        bench_writers(n_writers, transactions, journal_mode, 0.05, 8)
+    locked = bench_writers(n_writers, transactions, "wal", 10.0, 8)
+    locked += stress_rename()
+    if locked > 0:
+        sys.exit(1)
@@ -3,8 +3,10 @@ import os
 import unittest
 import sqlite3
 import polars as pl
+from unittest import mock
 
 from gbd_core.api import GBD, GBDException
+from gbd_core.grammar import Parser, ParserException
 from gbd_core.schema import Schema
 
 from tests import util
@@ -111,4 +113,389 @@ class APITestCase(unittest.TestCase):
         self.api.database.commit()
         api2 = GBD([self.file2])
         df: pl.DataFrame = api2.query("A = value1", resolve=["A"])
-        self.assertCountEqual(df["A"].to_list(), [ "value1" for _ in range(50) ])
\ No newline at end of file
+        self.assertCountEqual(df["A"].to_list(), [ "value1" for _ in range(50) ])
+
+    def test_set_values_by_query(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name1)
+        self.api.create_feature("C", None, self.name1)
+        self.api.set_values("A", "value1", [ str(i) for i in range(100) ], self.name1)
+        self.api.set_values("A", "value2", [ str(i) for i in range(50) ], self.name1)
+        # 1:1 feature: one row per selected hash
+        self.assertEqual(self.api.set_values_by_query("B", "tagged", "A = value2"), 50)
+        df: pl.DataFrame = self.api.query("B = tagged", resolve=["B"])
+        self.assertCountEqual(df['hash'].to_list(), [ str(i) for i in range(50) ])
+        # 1:n feature: only new (hash, value) pairs are counted
+        self.assertEqual(self.api.set_values_by_query("C", "x", "A = value1", [ str(i) for i in range(10) ]), 10)
+        self.assertEqual(self.api.set_values_by_query("C", "x", "A = value1"), 90)
+        df: pl.DataFrame = self.api.query("C = x", resolve=["C"])
+        self.assertEqual(len(df), 100)
+        self.assertEqual(self.api.set_values_by_query("C", "x", "A = value3"), 0)
+        # queries are checked like in query(), parameters are rejected
+        with self.assertRaises(ParserException):
+            self.api.set_values_by_query("C", "x", "A = = value1")
+        with self.assertRaises(GBDException):
+            self.api.set_values_by_query("C", "x", "A = $v")
+        self.assertEqual(len(self.api.query("C = x")), 100)
+
+    def test_query_timeout_and_cancellation(self):
+        from gbd_core.database import CancellationToken, QueryInterruptedException
+        endless = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+        with self.assertRaises(QueryInterruptedException):
+            self.api.database.query(endless, timeout=0.1)
+        token = CancellationToken()
+        token.cancel()
+        with self.assertRaises(QueryInterruptedException):
+            self.api.database.query(endless, cancel=token)
+        # connection remains usable
+        self.api.create_feature("A", "empty", self.name1)
+        self.api.set_values("A", "value1", [ str(i) for i in range(10) ], self.name1)
+        df: pl.DataFrame = self.api.query("A = value1", timeout=10, cancel=CancellationToken())
+        self.assertEqual(len(df), 10)
+        with self.assertRaises(QueryInterruptedException):
+            self.api.query("A = value1", cancel=token)
+
+    def test_pooled_concurrent_queries(self):
+        from concurrent.futures import ThreadPoolExecutor
+        self.api.create_feature("A", "empty", self.name1)
+        self.api.create_feature("B", None, self.name2)
+        self.api.set_values("A", "value1", [ str(i) for i in range(100) ], self.name1)
+        self.api.set_values("B", "value2", [ str(i) for i in range(50) ], self.name2)
+        with GBD([self.file1, self.file2], pool_size=4) as pooled:
+            queries = [ "A = value1", "B = value2", "A = value1 and B = value2" ] * 10
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                sizes = list(executor.map(lambda q: len(pooled.query(q, resolve=["B"])), queries))
+            self.assertEqual(sizes, [ 100, 50, 50 ] * 10)
+            # writes on the main connection become visible to pooled readers
+            pooled.set_values("A", "value3", [ "0" ], self.name1)
+            self.assertEqual(len(pooled.query("A = value3")), 1)
+
+    def test_parallel_query(self):
+        self.api.create_feature("A", "empty", self.name1)
+        self.api.create_feature("B", None, self.name1)
+        hashes = [ f"{i:04x}" for i in range(100) ]
+        self.api.set_values("A", "value1", hashes[::2], self.name1)
+        self.api.set_values("B", "x", hashes[:30], self.name1)
+        self.api.set_values("B", "y", hashes[20:], self.name1)
+        with GBD([self.file1, self.file2], pool_size=4) as pooled:
+            for args in [ dict(gbd_query="A = value1", resolve=["B"]), dict(resolve=["A", "B"], collapse="none"), dict(gbd_query="B = y") ]:
+                expected = pooled.query(**args)
+                result = pooled.query(**args, parallel=4)
+                self.assertTrue(result.equals(expected))
+        self.assertTrue(self.api.query(gbd_query="A = value1", parallel=3).equals(self.api.query(gbd_query="A = value1")))
+
+    def test_count_and_query_batches(self):
+        self.api.create_feature("A", "empty", self.name1)
+        self.api.set_values("A", "value1", [ str(i) for i in range(25) ], self.name1)
+        self.assertEqual(self.api.count("A = value1"), 25)
+        self.assertEqual(self.api.count("A = value1", hashes=["1", "2", "x"]), 2)
+        batches = list(self.api.query_batches("A = value1", resolve=["A"], batch_size=10))
+        self.assertEqual([ len(b) for b in batches ], [ 10, 10, 5 ])
+        self.assertTrue(pl.concat(batches).equals(self.api.query("A = value1", resolve=["A"])))
+
+    def test_collapse_list(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.set_values("A", "x,y", [ "1", "2" ], self.name1)
+        self.api.set_values("A", "z", [ "1" ], self.name1)
+        df: pl.DataFrame = self.api.query(resolve=["A"], collapse="LIST")
+        self.assertEqual(df.schema["A"], pl.List(pl.Utf8))
+        self.assertEqual(sorted(df.row(0)[1]), [ "x,y", "z" ])
+        self.assertEqual(df.row(1)[1], [ "x,y" ])
+        self.assertTrue(pl.concat(self.api.query_batches(resolve=["A"], collapse="list", batch_size=1)).equals(df))
+
+    def test_collapse_statistics(self):
+        self.api.create_feature("runtime", None, self.name1)
+        for value in [ "1", "2", "3", "10", "timeout" ]:
+            self.api.set_values("runtime", value, [ "a" ], self.name1)
+        self.api.set_values("runtime", "7", [ "b" ], self.name1)
+        def stat(collapse):
+            return self.api.query(resolve=["runtime"], collapse=collapse)["runtime"].to_list()
+        self.assertEqual(stat("median"), [ 2.5, 7.0 ])
+        self.assertEqual(stat("quantile(0.25)"), [ 1.75, 7.0 ])
+        self.assertEqual(stat("p100"), [ 10.0, 7.0 ])
+        self.assertEqual(stat("mode"), [ "1", "7" ])
+        self.assertAlmostEqual(stat("stddev")[0], 3.5355339, places=6)
+        self.assertEqual(stat("stddev")[1], 0.0)
+        with self.assertRaises(GBDException):
+            stat("quantile(1.5)")
+
+    def test_sort_and_limit(self):
+        self.api.create_feature("runtime", None, self.name1)
+        self.api.create_feature("track", "main", self.name1)
+        for i, value in enumerate([ "5", "30", "200", "timeout" ]):
+            self.api.set_values("runtime", value, [ str(i) ], self.name1)
+        self.api.set_values("runtime", "1000", [ "0" ], self.name1)
+        self.api.set_values("track", "other", [ "3" ], self.name1)
+        df = self.api.query(resolve=["runtime"], collapse="max", sort_by=[("runtime", True)])
+        self.assertEqual(df["hash"].to_list(), [ "2", "1", "0", "3" ])
+        # list and statistic columns are sorted by the largest (descending) or smallest value
+        df = self.api.query(resolve=["runtime"], collapse="list", sort_by=[("runtime", True)])
+        self.assertEqual(df["hash"].to_list(), [ "0", "2", "1", "3" ])
+        df = self.api.query(resolve=["runtime"], collapse="median", sort_by=[("runtime", False)])
+        self.assertEqual(df["hash"].to_list(), [ "3", "0", "1", "2" ])
+        df = self.api.query(resolve=["track"], sort_by=[("track", False), ("runtime", True)], limit=2, parallel=4)
+        self.assertEqual(df["hash"].to_list(), [ "0", "2" ])
+        df = self.api.query("track = main", sort_by=[("runtime", False)], limit=10, offset=2)
+        self.assertEqual(df["hash"].to_list(), [ "2" ])
+
+    def test_lookup(self):
+        self.api.create_feature("A", "empty", self.name1)
+        self.api.create_feature("B", None, self.name2)
+        self.api.set_values("A", "value1", [ "1", "2" ], self.name1)
+        self.api.set_values("B", "x", [ "1" ], self.name2)
+        self.api.set_values("B", "y", [ "1", "3" ], self.name2)
+        df: pl.DataFrame = self.api.lookup([ "3", "1", "4" ], [ "A", f"{self.name2}:B" ])
+        self.assertEqual(df.columns, [ "hash", "A", "B" ])
+        self.assertEqual(df["hash"].to_list(), [ "3", "1", "4" ])
+        self.assertEqual(df["A"].to_list(), [ None, "value1", None ])
+        self.assertEqual([ sorted(v) for v in df["B"].to_list() ], [ [ "y" ], [ "x", "y" ], [] ])
+        columns = self.api.lookup([ "2" ], [ "A", "B" ], frame=False)
+        self.assertEqual(columns, { "hash": [ "2" ], "A": [ "value1" ], "B": [ [] ] })
+        with self.assertRaises(GBDException):
+            self.api.lookup([ "1" ], [ "C" ])
+
+    def test_prepared_query(self):
+        from gbd_core.api import PreparedQuery
+        self.api.create_feature("family", "empty", self.name1)
+        self.api.create_feature("vars", "0", self.name1)
+        self.api.create_feature("track", None, self.name1)
+        for i in range(10):
+            self.api.set_values("family", "a" if i < 5 else "b", [ str(i) ], self.name1)
+            self.api.set_values("vars", str(i * 10), [ str(i) ], self.name1)
+            self.api.set_values("track", "t" + str(i % 2), [ str(i) ], self.name1)
+        prepared: PreparedQuery = self.api.prepare("family = $f and vars > $v and track != $t", resolve=["vars"])
+        self.assertEqual(prepared.query(f="a", v=15, t="t1")["hash"].to_list(), [ "2", "4" ])
+        self.assertEqual(prepared.query(f="b", v="60", t="t0")["hash"].to_list(), [ "7", "9" ])
+        self.assertEqual(len(prepared.query(f="a' or '1'='1", v=0, t="t2")), 0)
+        self.assertEqual(prepared.query(f="a", v=15, t="t1").equals(self.api.query("family = a and vars > 15 and track != t1", resolve=["vars"])), True)
+        with self.assertRaises(GBDException):
+            prepared.query(f="a", v="many", t="t1")
+        with self.assertRaises(GBDException):
+            prepared.query(f="a")
+        with self.assertRaises(GBDException):
+            self.api.query("family = $f")
+
+    def test_set_values_bulk(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name1)
+        self.api.create_feature("C", "0", self.name2)
+        rows = ((str(i), "A", "a" + str(i % 3)) for i in range(100))
+        self.api.set_values_bulk(rows)
+        self.api.set_values_bulk([ (str(i), "A", "x") for i in range(10) ] + [ (str(i), "B", "b'" + str(i)) for i in range(20) ] + [ ("1", "C", 7) ])
+        df: pl.DataFrame = self.api.query("A = a1", resolve=["B"])
+        self.assertEqual(len(df), 33)
+        self.assertEqual(self.api.lookup([ "1", "50" ], [ "A", "B", "C" ], frame=False), { "hash": [ "1", "50" ], "A": [ [ "a1", "x" ], [ "a2" ] ], "B": [ "b'1", "empty" ], "C": [ "7", None ] })
+        # the mirror column of the 1:n feature is kept in sync
+        self.assertEqual(len(self.api.query("A != None")), 100)
+        # several 1:1 columns per hash, in any order; the last value of a column wins
+        self.api.create_feature("E", "empty", self.name1)
+        self.api.set_values_bulk([ ("1", "E", "e1"), ("1", "B", "b"), ("2", "B", "b"), ("2", "E", "e2"), ("2", "E", "e3"), ("3", "E", "e4") ])
+        self.assertEqual(self.api.lookup([ "1", "2", "3" ], [ "B", "E" ], frame=False), { "hash": [ "1", "2", "3" ], "B": [ "b", "b", "b'3" ], "E": [ "e1", "e3", "e4" ] })
+        # unknown features abort the whole write
+        with self.assertRaises(GBDException):
+            self.api.set_values_bulk([ ("200", "A", "a"), ("200", "D", "d") ])
+        self.assertEqual(len(self.api.query("A = a")), 0)
+
+    def test_reset_values_set_based(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name1)
+        hashes = [ str(i) for i in range(2000) ]
+        self.api.set_values_bulk((h, "A", "v" + str(int(h) % 20)) for h in hashes)
+        self.api.set_values_bulk((h, "A", "w") for h in hashes[:10])
+        self.api.set_values_bulk((h, "B", "b") for h in hashes)
+        # many values times many hashes in one call
+        self.api.reset_values("A", [ "v" + str(i) for i in range(20) ], hashes[:1000])
+        self.assertEqual(len(self.api.query("A != None")), 1000 + 10)
+        self.assertEqual(self.api.lookup([ "5", "15", "1500" ], [ "A" ], frame=False)["A"], [ [ "w" ], [], [ "v0" ] ])
+        self.api.reset_values("B", [ "b" ], hashes[:5] + [ "x'y" ])
+        self.assertEqual(len(self.api.query("B = empty")), 5)
+        # a failing statement rolls back the whole transaction
+        with self.assertRaises(Exception):
+            with self.api.database.transaction():
+                self.api.database.delete("A", [ "w" ], [])
+                self.api.database.execute("DELETE FROM nonexisting")
+        self.assertEqual(len(self.api.query("A = w")), 10)
+        self.api.delete_hashes(hashes[1000:])
+        self.assertEqual(len(self.api.query("A != None")), 10)
+
+    def test_delete_hashes_all_databases(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name2)
+        self.api.set_values_bulk([ (str(i), "A", "a" + str(j)) for i in range(100) for j in range(2) ])
+        self.api.set_values_bulk([ (str(i), "B", "b") for i in range(50, 150) ])
+        hashes = [ str(i) for i in range(40, 60) ] + [ "x'y" ]
+        counts = self.api.delete_hashes(hashes)
+        self.assertEqual(counts, { f"{self.name1}.A": 40, f"{self.name1}.features": 20 })
+        count_b = f"SELECT COUNT(*) FROM {self.name2}.features WHERE B = 'b'"
+        self.assertEqual(self.api.database.query(count_b), [ (100,) ])
+        counts = self.api.delete_hashes(hashes, all_databases=True)
+        self.assertEqual(counts, { f"{self.name1}.A": 0, f"{self.name1}.features": 0, f"{self.name2}.features": 10 })
+        self.assertEqual(len(self.api.query("A != None")), 80)
+        self.assertEqual(self.api.database.query(count_b), [ (90,) ])
+
+    def test_copy_feature(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name1)
+        self.api.set_values_bulk([ (str(i), "A", "a" + str(j)) for i in range(100) for j in range(i % 3) ])
+        self.api.set_values_bulk([ (str(i), "B", "b" + str(i)) for i in range(100) ])
+        # 1:n to new 1:n feature in another database, restricted by query
+        self.assertEqual(self.api.copy_feature("A", "C", self.name2, "B like b1%"), 11)
+        self.assertEqual(len(self.api.query(f"{self.name2}:C != None")), 8)
+        self.assertEqual(sorted(self.api.lookup([ "11" ], [ f"{self.name2}:C" ], frame=False)["C"][0]), [ "a0", "a1" ])
+        # 1:n to 1:1 (smallest value wins) and 1:1 to 1:n, restricted by hashes
+        self.api.create_feature("D", "none", self.name2)
+        self.api.copy_feature("A", "D", self.name2, hashes=[ "1", "2", "3" ])
+        self.api.copy_feature("B", "E", self.name2)
+        self.assertEqual(self.api.lookup([ "1", "2", "3", "4" ], [ "D", "E" ], frame=False), { "hash": [ "1", "2", "3", "4" ], "D": [ "a0", "a0", "none", "none" ], "E": [ [ "b1" ], [ "b2" ], [ "b3" ], [ "b4" ] ] })
+        self.assertEqual(len(self.api.query("E != None")), 100)
+        # queries are checked like in query(), before the new feature is created
+        with self.assertRaises(GBDException):
+            self.api.copy_feature("A", "F", self.name2, "B = $b")
+        with self.assertRaises(ParserException):
+            self.api.copy_feature("A", "F", self.name2, "B = = b1")
+        self.assertFalse(self.api.feature_exists("F"))
+
+    def test_batch(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name2)
+        with self.api.batch():
+            for i in range(100):
+                self.api.set_values("A", "a", [ str(i) ])
+                self.api.set_values("B", "b", [ str(i) ])
+            # nothing is committed before the outermost block ends
+            other = sqlite3.connect(self.file1)
+            self.assertEqual(other.execute("SELECT COUNT(*) FROM A").fetchone(), (1,))
+            other.close()
+            # a failing nested block only rolls back its own writes
+            with self.assertRaises(GBDException):
+                with self.api.batch():
+                    self.api.set_values("A", "x", [ "1" ])
+                    self.api.create_feature("C", "empty", self.name1)
+                    self.api.set_values("D", "d", [ "1" ])
+            self.assertFalse(self.api.feature_exists("C"))
+            self.api.reset_values("B", [ "b" ], [ "0" ])
+        self.assertEqual(len(self.api.query("A = a and B = b")), 99)
+        self.assertEqual(len(self.api.query("A = x")), 0)
+        # an exception leaving the outermost block rolls back everything
+        with self.assertRaises(RuntimeError):
+            with self.api.batch():
+                self.api.set_values("A", "y", [ "1", "2" ])
+                with self.api.batch():
+                    self.api.rename_feature("A", "E", self.name1)
+                raise RuntimeError()
+        self.assertEqual(len(self.api.query("A = y")), 0)
+        self.assertTrue(self.api.feature_exists("A"))
+        self.assertFalse(self.api.feature_exists("E"))
+
+    def test_batch_nested_rollback_keeps_outer_features(self):
+        with self.api.batch():
+            self.api.create_feature("X", "empty", self.name1)
+            self.api.create_feature("Y", None, self.name1)
+            with self.assertRaises(GBDException):
+                with self.api.batch():
+                    self.api.rename_feature("Y", "Z", self.name1)
+                    self.api.set_values("D", "d", [ "1" ])
+            # features created by the open outer transaction survive the nested rollback
+            self.assertTrue(self.api.feature_exists("X"))
+            self.assertTrue(self.api.feature_exists("Y"))
+            self.assertFalse(self.api.feature_exists("Z"))
+            self.api.set_values("X", "x", [ "1" ])
+            self.api.set_values("Y", "y", [ "1" ])
+        self.assertEqual(self.api.lookup([ "1" ], [ "X", "Y" ], frame=False), { "hash": [ "1" ], "X": [ "x" ], "Y": [ [ "y" ] ] })
+
+    def test_import_frame(self):
+        self.api.create_feature("family", "empty", self.name1)
+        df = pl.DataFrame({ "hash": [ str(i) for i in range(10) ], "family": [ "f" + str(i % 2) for i in range(10) ], "cpu-time": [ i * 1.5 if i % 3 else None for i in range(10) ] })
+        self.assertEqual(self.api.import_frame(df, { "family": "family", "cpu-time": "runtime" }, batch_size=3), 16)
+        self.assertEqual(self.api.database.find("runtime").default, "empty")
+        self.assertEqual(self.api.lookup([ "0", "1", "2" ], [ "family", "runtime" ], frame=False), { "hash": [ "0", "1", "2" ], "family": [ "f0", "f1", "f0" ], "runtime": [ "empty", "1.5", "3.0" ] })
+        # repeated hashes create 1:n features, lazy frames are streamed
+        lf = pl.LazyFrame({ "id": [ "1", "1", "2" ], "track": [ "a", "b", "a" ] })
+        self.assertEqual(self.api.import_frame(lf, hash_column="id", target_db=self.name2), 3)
+        self.assertEqual(self.api.database.find("track").default, None)
+        self.assertEqual(len(self.api.query("track = a")), 2)
+        with self.assertRaises(GBDException):
+            self.api.import_frame(df, { "nonexisting": "x" })
+
+    @mock.patch.dict(os.environ, { "GBD_CACHE": "none" })
+    def test_csv_source(self):
+        csv = util.get_random_unique_filename('testcsv', '.csv')
+        with open(csv, 'w') as f:
+            f.write("hash;family name;vars;ratio\n")
+            for i in range(100):
+                f.write(f"{i};\"O'Fam {i % 3}\";{i * 10};{i / 4}\n")
+            f.write("100;;;\n")
+        try:
+            self.api.create_feature("A", "empty", self.name1)
+            self.api.set_values_bulk([ (str(i), "A", "a") for i in range(0, 101, 2) ])
+            api = GBD([self.file1, csv])
+            name = Schema.dbname_from_path(csv)
+            self.assertEqual(sorted(api.get_features(name)), [ "family_name", "ratio", "vars" ])
+            df = api.query("family_name like %\"Fam 1\" and vars > 500", resolve=["A", "vars", "ratio"], sort_by=[("vars", False)], collapse=None)
+            self.assertEqual(df["hash"].to_list(), [ str(i) for i in range(52, 100, 6) ])
+            self.assertEqual(df.row(0), ("52", "a", 520, 13.0))
+            self.assertEqual(api.lookup([ "100" ], [ "family_name", "vars" ], frame=False), { "hash": [ "100" ], "family_name": [ "" ], "vars": [ "" ] })
+            plan = api.database.query(f"EXPLAIN QUERY PLAN SELECT vars FROM {name}.features WHERE hash = '5'")
+            self.assertIn("features_hash", str(plan))
+            # CSV columns are aggregated like 1:1 features
+            self.assertEqual(sorted(api.query("min(ratio) >= 24")["hash"].to_list()), [ "96", "98" ])
+            with GBD([csv]) as csv_api:
+                self.assertEqual(sorted(csv_api.query("min(ratio) >= 24")["hash"].to_list()), [ "96", "97", "98", "99" ])
+                self.assertEqual(len(csv_api.query("count(vars) >= 1")), 101)
+                # numeric columns are compared without cast
+                self.assertEqual(len(csv_api.query("vars between 100 and 200")), 11)
+                self.assertNotIn("CAST", Parser("vars between 100 and 200").get_sql(csv_api.database))
+                self.assertIn("CAST", Parser("family_name between 1 and 2").get_sql(csv_api.database))
+        finally:
+            os.remove(csv)
+
+    @mock.patch.dict(os.environ, { "GBD_CACHE": "none" })
+    def test_csv_source_types_inferred_from_whole_file(self):
+        csv = util.get_random_unique_filename('typescsv', '.csv')
+        with open(csv, 'w') as f:
+            f.write("hash,runtime\n" + "".join(f"{i},{i}\n" for i in range(20000)) + "20000,timeout\n")
+        try:
+            with GBD([csv]) as api:
+                self.assertEqual(api.lookup([ "1", "20000" ], [ "runtime" ], frame=False)["runtime"], [ "1", "timeout" ])
+        finally:
+            os.remove(csv)
+
+    @mock.patch.dict(os.environ, { "GBD_CACHE": "none" })
+    def test_csv_source_keeps_text_of_numbers(self):
+        csv = util.get_random_unique_filename('zeroscsv', '.csv')
+        with open(csv, 'w') as f:
+            f.write("hash,id,time,bound,count,ratio\n1,007,1.50,inf,10,0.25\n2,010,2.0,5,,1.5\n")
+        try:
+            with GBD([csv]) as api:
+                features = [ "id", "time", "bound", "count", "ratio" ]
+                self.assertEqual(api.lookup([ "1", "2" ], features, frame=False), { "hash": [ "1", "2" ], "id": [ "007", "010" ], "time": [ "1.50", "2.0" ], "bound": [ "inf", "5" ], "count": [ 10, "" ], "ratio": [ 0.25, 1.5 ] })
+                self.assertEqual(api.query("id like 00%")["hash"].to_list(), [ "1" ])
+                name = Schema.dbname_from_path(csv)
+                types = { c: t for _, c, t, *_ in api.database.query(f"PRAGMA {name}.table_info(features)") }
+                self.assertEqual(types, { "hash": "TEXT", "id": "TEXT", "time": "TEXT", "bound": "TEXT", "count": "INTEGER", "ratio": "REAL" })
+        finally:
+            os.remove(csv)
+
+    def test_export(self):
+        self.api.create_feature("A", None, self.name1)
+        self.api.create_feature("B", "empty", self.name1)
+        self.api.set_values_bulk([ (str(i), "A", "a" + str(j)) for i in range(50) for j in range(i % 3) ])
+        self.api.set_values_bulk([ (str(i), "B", str(i * 0.5)) for i in range(50) ])
+        expected = self.api.query(resolve=["A", "B"], collapse="list")
+        for format, read in [ ("parquet", pl.read_parquet), ("ipc", pl.read_ipc), ("jsonl", pl.read_ndjson) ]:
+            path = util.get_random_unique_filename('export', '.' + format)
+            try:
+                self.assertEqual(self.api.export(path, format, resolve=["A", "B"], collapse="list", batch_size=7), 50)
+                self.assertTrue(read(path).equals(expected))
+            finally:
+                os.remove(path)
+        path = util.get_random_unique_filename('export', '.csv')
+        try:
+            self.assertEqual(self.api.export(path, "csv", "A = a1", resolve=["A", "B"], collapse="max", sort_by=[("B", True)], limit=3), 3)
+            self.assertEqual(open(path).read(), "hash,A,B\n47,a1,23.5\n44,a1,22.0\n41,a1,20.5\n")
+            self.assertEqual(self.api.export(path, "csv", "A = nonexisting", resolve=["A"]), 0)
+            self.assertEqual(open(path).read(), "hash,A\n")
+        finally:
+            os.remove(path)
+        with self.assertRaises(GBDException):
+            self.api.export(path, "xlsx")
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sqlite3
+import unittest
+
+from gbd_core.api import GBD
+from gbd_core.async_api import AsyncGBD
+from gbd_core.database import QueryInterruptedException
+from gbd_core.schema import Schema
+
+from tests import util
+
+
+class AsyncAPITestCase(unittest.IsolatedAsyncioTestCase):
+
+    hashes = [ f"{i:04x}" for i in range(100) ]
+
+    def setUp(self) -> None:
+        self.file = util.get_random_unique_filename('test', '.db')
+        sqlite3.connect(self.file).close()
+        self.name = Schema.dbname_from_path(self.file)
+        with GBD([self.file]) as api:
+            api.create_feature("A", "empty", self.name)
+            api.create_feature("B", None, self.name)
+            api.set_values("A", "value1", self.hashes[::2], self.name)
+            api.set_values("B", "x", self.hashes, self.name)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.file):
+            os.remove(self.file)
+        return super().tearDown()
+
+    async def test_concurrent_reads(self):
+        async with AsyncGBD([self.file], pool_size=2) as agbd:
+            results = await asyncio.gather(agbd.query("A = value1"), agbd.count("A = value1"), agbd.count("B = x"), agbd.query(resolve=["B"]))
+            self.assertEqual(len(results[0]), 50)
+            self.assertEqual(results[1:3], [ 50, 100 ])
+            self.assertEqual(results[3]["B"].to_list(), [ "x" ] * 100)
+
+    async def test_writes(self):
+        async with AsyncGBD([self.file]) as agbd:
+            await agbd.set_values("A", "value2", self.hashes[:10])
+            self.assertEqual(await agbd.count("A = value2"), 10)
+            self.assertEqual(await agbd.set_values_by_query("B", "y", "A = value2"), 10)
+            await agbd.reset_values("B", values=["x"], hashes=self.hashes[:5])
+            self.assertEqual(await agbd.count("B = x"), 95)
+
+    async def test_query_batches(self):
+        async with AsyncGBD([self.file], pool_size=1) as agbd:
+            sizes = [ len(batch) async for batch in agbd.query_batches("A = value1", batch_size=16) ]
+            self.assertEqual(sizes, [ 16, 16, 16, 2 ])
+            # the slot is released when the consumer stops early
+            async for batch in agbd.query_batches(batch_size=10):
+                break
+            self.assertEqual(await agbd.count(), 100)
+
+    async def test_cancellation(self):
+        async with AsyncGBD([self.file], pool_size=1) as agbd:
+            endless = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+            running = asyncio.create_task(agbd.read(agbd.gbd.database.query, endless))
+            await asyncio.sleep(0.1)
+            running.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await running
+            # the interrupted statement frees its connection for the next query
+            self.assertEqual(await asyncio.wait_for(agbd.count(), timeout=5), 100)
+            with self.assertRaises(QueryInterruptedException):
+                await agbd.read(agbd.gbd.database.query, endless, timeout=0.1)
@@ -70,6 +70,29 @@ class ParserFeatureExtractionTest(unittest.TestCase):
         # "a = b" - b on the right is a string literal (no parentheses), not a feature
         self.assertEqual(Parser("a = b").get_features(), {"a"})
 
+    def test_query_in_and_between_constraints(self):
+        self.assertEqual(Parser("a in (x, y, 'z w')").get_features(), {"a"})
+        self.assertEqual(Parser("a in (1) and c:b in (x)").get_features(), {"a", "c:b"})
+        self.assertEqual(Parser("a between 1 and 5 and b = 2").get_features(), {"a", "b"})
+        self.assertEqual(Parser("inst between x and y").get_features(), {"inst"})
+        self.assertEqual(Parser("a in (x, y, 'z w')").ast["q"]["lst"], ["x", "y", "z w"])
+        with self.assertRaises(ParserException):
+            Parser("a in ()")
+        with self.assertRaises(ParserException):
+            Parser("a between 1")
+
+    def test_query_regexp_constraints(self):
+        self.assertEqual(Parser("a regexp ^foo.*$").get_features(), {"a"})
+        self.assertEqual(Parser("a regexp 'x (y|z)' and b = 1").get_features(), {"a", "b"})
+        self.assertEqual(Parser("a regexp 'x (y|z)'").ast["q"]["reg"], "x (y|z)")
+
+    def test_query_aggregate_constraints(self):
+        self.assertEqual(Parser("count(a) >= 3 and b = 1").get_features(), {"a", "b"})
+        self.assertEqual(Parser("MAX(c:a) < 100").get_features(), {"c:a"})
+        self.assertEqual(Parser("count = 3").get_features(), {"count"})
+        with self.assertRaises(ParserException):
+            Parser("min(a) = x")
+
     def test_explicit_context(self):
         parser = Parser("c:a = 1")
         self.assertEqual(parser.get_features(), set(["c:a"]))
@@ -197,6 +220,83 @@ class ParserGetSqlTest(unittest.TestCase):
         self.assertIn("SELECT", s)
         self.assertIn("!= 5", s)
 
+    # ---- in / between ----------------------------------------------------
+
+    def test_1to1_in_list_is_inline(self):
+        s = self.sql("ufeat in (foo, bar)")
+        self.assertIn("IN ('foo', 'bar')", s)
+        self.assertNotIn("SELECT", s)
+
+    def test_1ton_in_list_uses_single_subquery(self):
+        s = self.sql("mfeat in (foo, bar, baz)")
+        self.assertEqual(s.count("SELECT"), 1)
+        self.assertIn("IN ('foo', 'bar', 'baz')", s)
+
+    def test_long_in_list_uses_json_each(self):
+        values = [f"v{i}" for i in range(Parser.IN_LIST_INLINE_MAX + 1)]
+        s = self.sql(f"ufeat in ({', '.join(values)})")
+        self.assertIn("json_each", s)
+
+    def test_in_list_escapes_quotes(self):
+        s = self.sql("ufeat in (\"it's\")")
+        self.assertIn("'it''s'", s)
+
+    def test_numeric_between_uses_cast(self):
+        s = self.sql("ufeat between 1 and 5.5")
+        self.assertIn("CAST", s)
+        self.assertIn("BETWEEN 1 AND 5.5", s)
+
+    def test_string_between_is_lexical(self):
+        s = self.sql("ufeat between a and c")
+        self.assertIn("BETWEEN 'a' AND 'c'", s)
+        self.assertNotIn("CAST", s)
+
+    # ---- regexp ----------------------------------------------------------
+
+    def test_1to1_regexp_is_inline(self):
+        s = self.sql("ufeat regexp ^fo+$")
+        self.assertIn("REGEXP '^fo+$'", s)
+        self.assertNotIn("SELECT", s)
+
+    def test_1ton_regexp_uses_in_subquery(self):
+        s = self.sql("mfeat regexp ^fo+$")
+        self.assertIn("SELECT", s)
+        self.assertIn("REGEXP", s)
+
+    def test_invalid_regexp_raises(self):
+        with self.assertRaises(ParserException):
+            self.sql("ufeat regexp 'fo[o'")
+
+    # ---- aggregates --------------------------------------------------------
+
+    def test_1to1_aggregate_is_inline(self):
+        self.assertEqual(self.sql("max(ufeat) < 5"), f"(CAST({self.dbname}.features.ufeat AS FLOAT) < 5)")
+        self.assertEqual(self.sql("count(ufeat) = 1"), "(1 = 1)")
+
+    def test_1ton_aggregate_uses_having_subquery(self):
+        s = self.sql("avg(mfeat) > 5")
+        self.assertIn("IN (SELECT hash", s)
+        self.assertIn("GROUP BY hash HAVING avg(CAST(value AS FLOAT)) > 5", s)
+
+    def test_1ton_count_including_zero_uses_not_in(self):
+        s = self.sql("count(mfeat) < 3")
+        self.assertIn("NOT IN (SELECT hash", s)
+        self.assertIn("HAVING NOT (count(value) < 3)", s)
+
+    # ---- parameters --------------------------------------------------------
+
+    def test_parameters_compile_to_named_placeholders(self):
+        parser = Parser("ufeat = $f and mfeat > $v")
+        s = parser.get_sql(self.db)
+        self.assertIn(f"{self.dbname}.features.ufeat = :f", s)
+        self.assertIn("CAST(", s)
+        self.assertIn("> :v)", s)
+        self.assertEqual(parser.params, {"f": False, "v": True})
+
+    def test_parameter_type_conflict_raises(self):
+        with self.assertRaises(ParserException):
+            self.sql("ufeat = $f and ufeat > $f")
+
     # ---- boolean operators -----------------------------------------------
 
     def test_and_emits_sql_and(self):
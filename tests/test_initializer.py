@@ -10,7 +10,7 @@ from gbd_core.database import Database
 from gbd_core.schema import Schema
 from gbd_core.api import GBD, GBDException
 from gbd_core import config
-from gbd_init.initializer import Initializer
+from gbd_init.initializer import Initializer, InitializerException
 from gbd_core.contexts import identify
 from gbd_init.feature_extractors import init_local, init_features_generic, build_extractors
 from gbd_init import external
@@ -52,6 +52,24 @@ class InitTestCase(unittest.TestCase):
         df: pl.DataFrame = api.query("random > 0", [], ["random"])
         self.assertEqual(len(df), 100)
 
+    def test_writer_thread_batches(self):
+        api = GBD([self.file], verbose=False)
+        rlimits = { 'jobs': 1, 'tlim': 5000, 'mlim': 2000, 'flim': 1000 }
+        init = Initializer(api, rlimits, self.name, [('random', 0), ('multi', None)], self.init_random)
+        init.BATCH_ROWS = 7
+        init.create_features()
+        with init.writer():
+            for n in range(100):
+                init.save_features([ ('random', str(n), n + 1), ('multi', str(n), 'a'), ('multi', str(n), 'b') ])
+        # all results are flushed when the writer stops
+        self.assertEqual(len(api.query("random > 0 and multi = b")), 100)
+        self.assertIsNone(init.queue)
+        # a failing batch is reported to the producer
+        with self.assertRaises(InitializerException):
+            with init.writer():
+                init.save_features([ ('unknown', '1', 'x') ])
+        self.assertEqual(len(api.query("random > 0")), 100)
+
     def test_init_local(self):
         api = GBD([self.file], verbose=False)
         rlimits = { 'jobs': 1, 'tlim': 5000, 'mlim': 2000, 'flim': 1000 }
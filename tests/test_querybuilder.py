@@ -127,6 +127,35 @@ class QueryNonUniqueTestCase(unittest.TestCase):
         res = [h for (h,) in self.db.query(q)]
         self.assertEqual(res, ["b"])
 
+    def test_in_list(self):
+        self.assertSetEqual(set(self.query(f"{self.feat3} in (1, 100)")), {"a", "c"})
+        self.assertSetEqual(set(self.query(f"{self.dbname2}:{self.feat} in ({self.val1}, other)")), {"a"})
+        self.assertSetEqual(set(self.query(f"not {self.feat3} in (1, 100)")), {"b"})
+
+    def test_long_in_list(self):
+        values = ", ".join(str(i) for i in range(200, 500)) + ", 10"
+        self.assertEqual(self.query(f"{self.feat3} in ({values})"), ["b"])
+        self.assertSetEqual(set(self.query(f"{self.feat} in ({values}, {self.val1})")), {"a", "b", "c"})
+
+    def test_between(self):
+        self.assertSetEqual(set(self.query(f"{self.feat3} between 1 and 10")), {"a", "b"})
+        self.assertSetEqual(set(self.query(f"{self.feat3} between 5 and 1000 and {self.feat3} != 100")), {"b"})
+        self.assertSetEqual(set(self.query(f"{self.dbname2}:{self.feat} between value2 and value9")), {"a", "b", "c"})
+        self.assertEqual(self.query(f"{self.feat} between value2 and value9"), [])
+
+    def test_aggregate_constraints(self):
+        self.assertSetEqual(set(self.query(f"count({self.dbname2}:{self.feat}) >= 2")), {"a"})
+        self.assertSetEqual(set(self.query(f"count({self.dbname2}:{self.feat}) = 1")), {"b", "c"})
+        self.assertSetEqual(set(self.query(f"max({self.feat3}) < 50")), {"a", "b"})
+        self.db.create_feature("runtime", default_value=None, target_db=self.dbname1)
+        self.db.set_values({"runtime": 10}, ["a"])
+        self.db.set_values({"runtime": 200}, ["a", "b"])
+        self.assertSetEqual(set(self.query("max(runtime) < 100")), set())
+        self.assertSetEqual(set(self.query("min(runtime) < 100")), {"a"})
+        self.assertSetEqual(set(self.query("avg(runtime) > 100")), {"a", "b"})
+        self.assertSetEqual(set(self.query("count(runtime) < 2")), {"b", "c"})
+        self.assertSetEqual(set(self.query("count(runtime) = 0")), {"c"})
+
     def test_numeric_eq_1to1(self):
         res = self.query(f"{self.feat3} = 10")
         self.assertEqual(res, ["b"])
@@ -146,6 +175,19 @@ class QueryNonUniqueTestCase(unittest.TestCase):
         self.assertIn(self.val1, hash_a_row[1])
         self.assertIn(self.val2, hash_a_row[1])
 
+    def test_collapse_list_returns_json_arrays(self):
+        rows = self.build_and_run("", resolve=[f"{self.dbname2}:{self.feat}", self.feat3], collapse="list")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], ("a", '["value1","value2"]', '["1"]'))
+        self.assertEqual(rows[1], ("b", '["value2"]', '["10"]'))
+
+    def test_sort_limit_offset(self):
+        self.assertEqual(self.build_and_run("", sort_by=[(self.feat3, True)]), [("c",), ("b",), ("a",)])
+        self.assertEqual(self.build_and_run("", sort_by=[(self.feat3, False)], limit=2), [("a",), ("b",)])
+        self.assertEqual(self.build_and_run("", sort_by=[(self.feat3, True)], offset=1), [("b",), ("a",)])
+        rows = self.build_and_run("", resolve=[self.feat3], collapse="max", sort_by=[(self.feat3, True)], limit=1, offset=1)
+        self.assertEqual(rows, [("b", "10")])
+
 
 class LikeQueryTestCase(unittest.TestCase):
     """Tests for 'like' / 'unlike' query operators on a 1:n (multi-valued) feature.
@@ -222,6 +264,18 @@ class LikeQueryTestCase(unittest.TestCase):
         self.assertEqual(len(res), 1, "like without wildcards should behave like equality")
         self.assertIn("hash_planning", res)
 
+    # -- regexp: equivalent to a chain of like constraints --
+
+    def test_regexp(self):
+        res = [h for (h,) in self.query("filename regexp '^(xor|plan)'")]
+        self.assertSetEqual(set(res), {"hash_xorshift", "hash_planning"})
+        res = [h for (h,) in self.query("filename like xor% or filename like plan%")]
+        self.assertSetEqual(set(res), {"hash_xorshift", "hash_planning"})
+
+    def test_regexp_with_resolve(self):
+        rows = self.query("local regexp sched", resolve=["filename"], collapse="group_concat")
+        self.assertEqual(rows, [("hash_scheduling", "scheduling.cnf")])
+
     # -- no results expected --
 
     def test_like_no_match(self):
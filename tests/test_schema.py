@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import os
+import tempfile
 import unittest
 import sqlite3
+import threading
+from unittest import mock
 
-from gbd_core.database import Database
-from gbd_core.schema import Schema
+from gbd_core.database import Database, DatabaseException
+from gbd_core.schema import CsvCache, Schema
 
 from tests import util
 
@@ -51,6 +54,26 @@ class SchemaTestCase(unittest.TestCase):
         self.assertEqual(finfo.default, None)
         self.assertEqual(finfo.database, self.name)
 
+    def test_create_features_in_one_transaction(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.db.transaction():
+                self.db.create_feature("featA", default_value="empty")
+                self.db.create_feature("featB", default_value=None)
+                self.db.execute("SELECT * FROM nonexisting")
+        tables = [t for (t,) in sqlite3.connect(self.file).execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        self.assertEqual(tables, [])
+        self.assertNotIn("featA", self.db.get_features())
+        self.db.create_feature("featA", default_value="empty")
+
+    def test_unbound_schema_writes(self):
+        schema = Schema.create(self.file)
+        schema.create_feature("featA", default_value="empty")
+        schema.create_feature("featB", default_value=None)
+        schema.set_values({"featA": "a", "featB": "b"}, ["h1", "h2"])
+        con = sqlite3.connect(self.file)
+        self.assertEqual(con.execute("SELECT hash, featA, featB FROM features ORDER BY hash").fetchall(), [("h1", "a", "h1"), ("h2", "a", "h2")])
+        self.assertEqual(con.execute("SELECT count(*) FROM featB").fetchone(), (3,))
+
 
 class SchemaUtilityTest(unittest.TestCase):
     """Tests for Schema class-level utilities that don't require a full Database."""
@@ -167,3 +190,135 @@ class FeatureCreationTest(unittest.TestCase):
             if os.path.exists(cnf_path):
                 os.remove(cnf_path)
 
+
+class ConcurrentWriteTest(unittest.TestCase):
+    """Tests for journal modes, write locks and retries of locked databases."""
+
+    def setUp(self):
+        self.file = util.get_random_unique_filename("test_locks", ".db")
+        self.file2 = util.get_random_unique_filename("test_locks2", ".db")
+        sqlite3.connect(self.file).close()
+        sqlite3.connect(self.file2).close()
+        self.name = Schema.dbname_from_path(self.file)
+        self.name2 = Schema.dbname_from_path(self.file2)
+        self.db = Database([self.file, self.file2])
+
+    def tearDown(self):
+        self.db.__exit__(None, None, None)
+        for file in (self.file, self.file2):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(file + suffix):
+                    os.remove(file + suffix)
+
+    def test_journal_mode_wal(self):
+        with Database([self.file], journal_mode="wal") as db:
+            db.create_feature("featA", default_value="empty")
+            self.assertEqual(db.pragma(f"{self.name}.journal_mode"), [("wal",)])
+        con = sqlite3.connect(self.file)
+        self.assertEqual(con.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        con.execute("PRAGMA journal_mode = delete")
+        con.close()
+        with self.assertRaises(DatabaseException):
+            self.db.set_journal_mode("nojournal")
+
+    def test_write_retried_while_locked(self):
+        self.db.create_feature("featA", default_value="empty")
+        other = sqlite3.connect(self.file, isolation_level=None, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        db = Database([self.file], busy_timeout=0.01, retries=0)
+        with self.assertRaises(sqlite3.OperationalError):
+            db.set_values({"featA": "x"}, ["h1"])
+        db.retries = 8
+        threading.Timer(0.05, other.commit).start()
+        db.set_values({"featA": "x"}, ["h1"])
+        self.assertEqual(db.query(f"SELECT featA FROM {self.name}.features WHERE hash = 'h1'"), [("x",)])
+        other.close()
+
+    def test_writers_of_other_databases_do_not_block(self):
+        self.db.create_feature("featA", default_value="empty", target_db=self.name)
+        self.db.create_feature("featB", default_value=None, target_db=self.name2)
+        other = sqlite3.connect(self.file2, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        db = Database([self.file, self.file2], busy_timeout=0.01, retries=0)
+        db.set_values({"featA": "x"}, ["h1"])
+        db.set_values_bulk([("h2", "featA", "y")])
+        with self.assertRaises(sqlite3.OperationalError):
+            db.set_values({"featB": "x"}, ["h1"])
+        other.commit()
+        other.close()
+        db.set_values({"featB": "x"}, ["h1"])
+        self.assertEqual(db.query(f"SELECT hash, featA FROM {self.name}.features ORDER BY hash"), [("h1", "x"), ("h2", "y")])
+        db.__exit__(None, None, None)
+
+
+class CsvCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cachedir = os.path.join(self.tmpdir.name, "cache")
+        self.csv = os.path.join(self.tmpdir.name, "source.csv")
+        self.write_csv(10)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+        return super().tearDown()
+
+    def write_csv(self, rows, path=None):
+        with open(path or self.csv, 'w') as f:
+            f.write("hash,n\n" + "".join(f"h{i},{i}\n" for i in range(rows)))
+
+    def load(self, path=None):
+        schema = Schema.from_csv(path or self.csv)
+        rows = schema.dbcon.execute("SELECT COUNT(*), SUM(n) FROM features").fetchone()
+        schema.dbcon.close()
+        return schema, rows
+
+    def test_csv_converted_once(self):
+        with mock.patch.dict(os.environ, { "GBD_CACHE": self.cachedir }):
+            schema, rows = self.load()
+            self.assertEqual(rows, (10, 45))
+            cached = os.listdir(self.cachedir)
+            self.assertEqual(len(cached), 1)
+            with mock.patch.object(Schema, "features_from_csv", side_effect=AssertionError("CSV parsed again")):
+                schema, rows = self.load()
+            self.assertEqual(rows, (10, 45))
+            self.assertEqual(sorted(schema.features), [ "hash", "n" ])
+            # a modified CSV invalidates its cached conversion
+            self.write_csv(20)
+            os.utime(self.csv, ns=(0, 1))
+            schema, rows = self.load()
+            self.assertEqual(rows, (20, 190))
+            self.assertEqual(len(os.listdir(self.cachedir)), 1)
+            self.assertNotEqual(os.listdir(self.cachedir), cached)
+
+    def test_conversion_change_invalidates_cache(self):
+        with mock.patch.dict(os.environ, { "GBD_CACHE": self.cachedir }):
+            self.load()
+            cached = os.listdir(self.cachedir)
+            with mock.patch.object(CsvCache, "FORMAT", CsvCache.FORMAT + 1):
+                with mock.patch.object(Schema, "features_from_csv", wraps=Schema.features_from_csv) as convert:
+                    self.assertEqual(self.load()[1], (10, 45))
+                convert.assert_called_once()
+            self.assertEqual(len(os.listdir(self.cachedir)), 1)
+            self.assertNotEqual(os.listdir(self.cachedir), cached)
+
+    def test_cache_disabled(self):
+        with mock.patch.dict(os.environ, { "GBD_CACHE": "none" }):
+            self.assertIsNone(CsvCache.from_environment())
+            self.assertEqual(self.load()[1], (10, 45))
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_least_recently_used_evicted(self):
+        paths = [ os.path.join(self.tmpdir.name, f"source{i}.csv") for i in range(3) ]
+        for path in paths:
+            self.write_csv(1000, path)
+        with mock.patch.dict(os.environ, { "GBD_CACHE": self.cachedir }):
+            for path in paths:
+                self.load(path)
+        size = max(os.path.getsize(os.path.join(self.cachedir, name)) for name in os.listdir(self.cachedir))
+        cache = CsvCache(self.cachedir, 2 * size)
+        for age, path in enumerate([ paths[1], paths[0], paths[2] ]):
+            os.utime(cache.entry(path)[1], (age, age))
+        cache.evict()
+        self.assertEqual(sorted(os.listdir(self.cachedir)), sorted(os.path.basename(cache.entry(p)[1]) for p in paths[::2]))
@@ -16,7 +16,7 @@ import argparse
 import unittest
 
 from gbd_core import util
-from gbd_core.util_argparse import add_resource_limits_arguments
+from gbd_core.util_argparse import add_resource_limits_arguments, collapse_type, feature_map_type
 
 
 class ResourceLimitsHelpNoteTestCase(unittest.TestCase):
@@ -53,5 +53,28 @@ class ResourceLimitsHelpNoteTestCase(unittest.TestCase):
         self.assertIn("resource limits (per instance)", parser.format_help())
 
 
+class CollapseTypeTestCase(unittest.TestCase):
+
+    def test_accepts_collapse_functions(self):
+        for collapse in ["group_concat", "MIN", "list", "median", "quantile(0.9)", "p90", "none"]:
+            self.assertEqual(collapse_type(collapse), collapse.lower())
+
+    def test_rejects_invalid_collapse_functions(self):
+        for collapse in ["first", "quantile(2)", "quantile()", "p900"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                collapse_type(collapse)
+
+
+class FeatureMapTypeTestCase(unittest.TestCase):
+
+    def test_accepts_column_feature_pairs(self):
+        self.assertEqual(feature_map_type("cpu-time=runtime"), ("cpu-time", "runtime"))
+
+    def test_rejects_invalid_pairs(self):
+        for s in [ "runtime", "=runtime", "col=1runtime" ]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                feature_map_type(s)
+
+
 if __name__ == "__main__":
     unittest.main()